@@ -1,35 +1,315 @@
+import hashlib
+import json
 import os
-import requests
 
+from functools import cache
 from pathlib import Path
 from dotenv import load_dotenv
 
+from cache import DiskCache, LRUCache, TieredCache, make_key
+from governor import get_governor
+
 
 _ = load_dotenv(Path(__file__).parent / ".env")
 
+GEMINI_API_BASE = os.environ.get(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta"
+)
+GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT", "120"))
+GEMINI_CONNECT_TIMEOUT = float(os.environ.get("GEMINI_CONNECT_TIMEOUT", "10"))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "32"))
+GEMINI_KEEPALIVE_EXPIRY = float(os.environ.get("GEMINI_KEEPALIVE_EXPIRY", "60"))
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") == "1"
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DIR = os.environ.get(
+    "LLM_CACHE_DIR", str(Path(__file__).parent / ".cache" / "llm")
+)
+
+llm_cache = TieredCache(
+    LRUCache(LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL),
+    DiskCache(LLM_CACHE_DIR, ttl=LLM_CACHE_TTL) if LLM_CACHE_DIR else None,
+    name="llm",
+)
+
+# Gemini context caching (cachedContents) for static prompt prefixes such as
+# prompts/master.txt; names are shared by worker processes through the disk tier
+GEMINI_CONTEXT_CACHE = os.environ.get("GEMINI_CONTEXT_CACHE", "0") == "1"
+GEMINI_CONTEXT_CACHE_TTL = float(os.environ.get("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+# Stop handing out a cached prefix a little before the server expires it
+_context_ttl = max(60.0, GEMINI_CONTEXT_CACHE_TTL - 300)
+context_cache = TieredCache(
+    LRUCache(64, ttl=_context_ttl),
+    (
+        DiskCache(Path(LLM_CACHE_DIR) / "contexts", ttl=_context_ttl)
+        if LLM_CACHE_DIR
+        else None
+    ),
+    name="gemini_context",
+)
+_uncacheable_prefixes = set()
+
+# Shared connections, both created on first use: one keep-alive session for
+# sync callers, one pooled AsyncClient (inside the running event loop) for
+# async ones. requests and httpx are only imported then.
+_async_client = None
+gemini_governor = get_governor("gemini")
+
+
+@cache
+def get_session():
+    import requests
+
+    return requests.Session()
 
-def gemini(prompt):
+
+def _request(
+    prompt, method="generateContent", cached_content=None, response_schema=None
+):
     api_key = os.environ["GEMINI_API_KEY"]
     model = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
-    api_endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
+    api_endpoint = f"{GEMINI_API_BASE}/models/{model}:{method}?key={api_key}"
+    if method == "streamGenerateContent":
+        api_endpoint += "&alt=sse"
 
     headers = {
         "Content-Type": "application/json",
     }
 
     payload = {
-        "contents": [{"parts": [{"text": prompt}]}],
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
     }
+    if cached_content:
+        payload["cachedContent"] = cached_content
+    if response_schema:
+        # Structured output: the response is JSON matching the schema
+        payload["generationConfig"] = {
+            "responseMimeType": "application/json",
+            "responseSchema": response_schema,
+        }
+    return api_endpoint, headers, payload
 
-    # Making the POST request
-    try:
-        response = requests.post(api_endpoint, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an error for bad responses (4XX, 5XX)
 
-        # Handle the response
-        response_data = response.json()
-        return response_data["candidates"][0]["content"]["parts"][0]["text"]
+def _prefix_text(prefix):
+    if prefix is None:
+        return ""
+    return prefix if isinstance(prefix, str) else prefix.text
+
+
+def _cache_key(prompt, prefix=None, params=None):
+    # Keyed on the full prompt text, so context-cached and inline requests share
+    # entries
+    model = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+    text = _prefix_text(prefix) + prompt
+    prompt_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return make_key(model, prompt_hash, params or {})
+
+
+def _cache_get(key):
+    if not LLM_CACHE_ENABLED:
+        return None
+    return llm_cache.get(key)
+
+
+def _cache_set(key, text):
+    if LLM_CACHE_ENABLED and text is not None:
+        llm_cache.set(key, text)
+
+
+def _extract_text(response_data):
+    return response_data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+def gemini(prompt, prefix=None):
+    key = _cache_key(prompt, prefix)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+    api_endpoint, headers, payload = _request(_prefix_text(prefix) + prompt)
+
+    # Making the POST request; rate limits, 429/5xx retries with backoff and
+    # adaptive concurrency are handled by the shared governor, which raises
+    # once retries are exhausted
+    response = gemini_governor.call(
+        lambda: get_session().post(
+            api_endpoint,
+            headers=headers,
+            json=payload,
+            timeout=(GEMINI_CONNECT_TIMEOUT, GEMINI_TIMEOUT),
+        )
+    )
+
+    # Handle the response
+    text = _extract_text(response.json())
+    _cache_set(key, text)
+    return text
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(GEMINI_TIMEOUT, connect=GEMINI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONCURRENCY,
+                max_keepalive_connections=GEMINI_MAX_CONCURRENCY,
+                keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _async_client
+
+
+def _context_key(prefix):
+    model = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+    return make_key("cachedContent", model, prefix.version)
+
 
-    except requests.exceptions.RequestException as e:
-        print("An error occurred:", e)
+async def get_cached_content(prefix):
+    # Returns a cachedContents/... name holding the static prompt prefix, creating
+    # it on first use. Prefixes the API refuses to cache (e.g. below the model's
+    # minimum token count) are sent inline from then on.
+    if not GEMINI_CONTEXT_CACHE or prefix is None or isinstance(prefix, str):
         return None
+    key = _context_key(prefix)
+    name = context_cache.get(key)
+    if name is not None or key in _uncacheable_prefixes:
+        return name
+
+    model = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+    api_key = os.environ["GEMINI_API_KEY"]
+    import httpx
+
+    client = get_async_client()
+    body = {
+        "model": f"models/{model}",
+        "contents": [{"role": "user", "parts": [{"text": prefix.text}]}],
+        "ttl": f"{int(GEMINI_CONTEXT_CACHE_TTL)}s",
+    }
+    try:
+        response = await gemini_governor.acall(
+            lambda: client.post(
+                f"{GEMINI_API_BASE}/cachedContents?key={api_key}", json=body
+            )
+        )
+    except httpx.HTTPStatusError as e:
+        print(f"Context caching disabled for prompt {prefix.name}:", e)
+        _uncacheable_prefixes.add(key)
+        return None
+    name = response.json()["name"]
+    context_cache.set(key, name)
+    return name
+
+
+def _is_stale_context(error, cached_content):
+    # The cached prefix expired or was deleted: retry once with the prompt inline
+    import httpx
+
+    return (
+        cached_content is not None
+        and isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in (400, 403, 404)
+    )
+
+
+def _prefixed_request(
+    prompt, prefix, cached_content, method="generateContent", response_schema=None
+):
+    if cached_content is None:
+        return _request(_prefix_text(prefix) + prompt, method, None, response_schema)
+    return _request(prompt, method, cached_content, response_schema)
+
+
+async def gemini_async(prompt, prefix=None, response_schema=None, refresh=False):
+    # refresh skips the cached response (e.g. one that failed validation) and
+    # replaces it with the new one
+    import httpx
+
+    client = get_async_client()
+    key = _cache_key(prompt, prefix, response_schema and {"schema": response_schema})
+    cached = None if refresh else _cache_get(key)
+    if cached is not None:
+        return cached
+
+    async def post(cached_content):
+        api_endpoint, headers, payload = _prefixed_request(
+            prompt, prefix, cached_content, response_schema=response_schema
+        )
+        return await gemini_governor.acall(
+            lambda: client.post(api_endpoint, headers=headers, json=payload)
+        )
+
+    cached_content = await get_cached_content(prefix)
+    try:
+        response = await post(cached_content)
+    except httpx.HTTPStatusError as e:
+        if not _is_stale_context(e, cached_content):
+            raise
+        context_cache.delete(_context_key(prefix))
+        response = await post(None)
+    text = _extract_text(response.json())
+    _cache_set(key, text)
+    return text
+
+
+async def gemini_stream(prompt, prefix=None, response_schema=None):
+    # Yields text chunks as Gemini produces them (streamGenerateContent over SSE)
+    import httpx
+
+    client = get_async_client()
+    key = _cache_key(prompt, prefix, response_schema and {"schema": response_schema})
+    cached = _cache_get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    async def open_stream(cached_content):
+        api_endpoint, headers, payload = _prefixed_request(
+            prompt, prefix, cached_content, "streamGenerateContent", response_schema
+        )
+
+        async def send():
+            request = client.build_request(
+                "POST", api_endpoint, headers=headers, json=payload
+            )
+            response = await client.send(request, stream=True)
+            if response.is_error:
+                await response.aread()  # release the connection before a retry
+            return response
+
+        return await gemini_governor.acall(send)
+
+    # Retries cover the request up to the first byte; once text has been
+    # yielded a failure propagates to the caller
+    cached_content = await get_cached_content(prefix)
+    try:
+        response = await open_stream(cached_content)
+    except httpx.HTTPStatusError as e:
+        if not _is_stale_context(e, cached_content):
+            raise
+        context_cache.delete(_context_key(prefix))
+        response = await open_stream(None)
+
+    chunks = []
+    try:
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = json.loads(line[len("data:") :])
+            parts = data.get("candidates", [{}])[0].get("content", {})
+            for part in parts.get("parts", []):
+                if part.get("text"):
+                    chunks.append(part["text"])
+                    yield part["text"]
+    finally:
+        await response.aclose()
+    _cache_set(key, "".join(chunks))
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
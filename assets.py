@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+
+from cache import LRUCache, make_key
+from files import write_atomic
+from image_optimizer import (
+    IMAGE_BOUNDS,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_OPTIMIZE,
+    LOGO_BOUNDS,
+    optimize_image,
+)
+from metrics import count_cache
+
+
+ASSET_CACHE_DIR = Path(
+    os.environ.get("ASSET_CACHE_DIR", str(Path(__file__).parent / ".cache" / "assets"))
+)
+ASSET_CACHE_MAX_BYTES = int(os.environ.get("ASSET_CACHE_MAX_BYTES", str(512 << 20)))
+ASSET_MEMORY_ITEMS = int(os.environ.get("ASSET_MEMORY_ITEMS", "64"))
+# Cached bytes younger than this are served without asking the origin server
+ASSET_FRESHNESS = float(os.environ.get("ASSET_FRESHNESS", "3600"))
+ASSET_TIMEOUT = float(os.environ.get("ASSET_TIMEOUT", "15"))
+ASSET_PREFETCH_DEADLINE = float(os.environ.get("ASSET_PREFETCH_DEADLINE", "20"))
+ASSET_PREFETCH_WORKERS = int(os.environ.get("ASSET_PREFETCH_WORKERS", "16"))
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:106.0) Gecko/20100101 Firefox/106.0"
+)
+
+
+class AssetStore:
+    # Content-addressed store for downloaded images. Blobs are saved once per
+    # sha256 under blobs/, and a per-URL index records which blob the URL served
+    # along with its ETag/Last-Modified validators for conditional revalidation.
+    def __init__(self, directory, max_bytes, memory_items=ASSET_MEMORY_ITEMS):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(memory_items)
+        self._session = None
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        # Created by the first download, so requests is not imported with
+        # this module
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+
+                    session = requests.Session()
+                    session.headers["User-Agent"] = USER_AGENT
+                    self._session = session
+        return self._session
+
+    def _blob_path(self, digest):
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def _index_path(self, url):
+        key = make_key("asset", url)
+        return self.directory / "index" / key[:2] / f"{key}.json"
+
+    def _read_index(self, url):
+        try:
+            return json.loads(self._index_path(url).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, url, entry):
+        self._write_json(self._index_path(url), entry)
+
+    def _write_json(self, path, entry):
+        write_atomic(path, json.dumps(entry))
+
+    def _read_blob(self, digest):
+        content = self.memory.get(digest)
+        if content is not None:
+            return content
+        path = self._blob_path(digest)
+        try:
+            content = path.read_bytes()
+        except OSError:
+            return None
+        os.utime(path)  # mtime doubles as last-access time for eviction
+        self.memory.set(digest, content)
+        return content
+
+    def _write_blob(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            write_atomic(path, content)
+            self._evict()
+        self.memory.set(digest, content)
+        return digest
+
+    # Blob access by digest for other content-addressed data (slide cache media)
+    def get_blob(self, digest):
+        return self._read_blob(digest)
+
+    def put_blob(self, content):
+        return self._write_blob(content)
+
+    def _evict(self):
+        with self._lock:
+            blobs = []
+            total = 0
+            for path in (self.directory / "blobs").glob("*/*"):
+                if path.suffix == ".tmp":
+                    continue
+                stat = path.stat()
+                blobs.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            blobs.sort()
+            while total > self.max_bytes and len(blobs) > 1:
+                _, size, path = blobs.pop(0)
+                path.unlink(missing_ok=True)
+                self.memory.delete(path.name)
+                total -= size
+                self.stats["evictions"] += 1
+
+    def derived(self, content, name, params, fn):
+        # fn(content), computed once per source blob and params and stored as a
+        # blob itself (e.g. the downsampled copy of an image)
+        key = make_key(name, hashlib.sha256(content).hexdigest(), params)
+        path = self.directory / "derived" / key[:2] / f"{key}.json"
+        try:
+            result = self._read_blob(json.loads(path.read_text())["sha256"])
+        except (OSError, ValueError, KeyError):
+            result = None
+        if result is not None:
+            count_cache(name, "hit")
+            return result
+        count_cache(name, "miss")
+        result = fn(content)
+        self._write_json(path, {"sha256": self._write_blob(result)})
+        return result
+
+    def fetch(self, url, timeout=ASSET_TIMEOUT):
+        entry = self._read_index(url)
+        content = self._read_blob(entry["sha256"]) if entry else None
+
+        if content is not None and time.time() - entry["fetched_at"] < ASSET_FRESHNESS:
+            self.stats["hits"] += 1
+            count_cache("asset", "hit")
+            return content
+
+        headers = {}
+        if content is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and content is not None:
+            self.stats["revalidated"] += 1
+            count_cache("asset", "revalidated")
+            entry["fetched_at"] = time.time()
+            self._write_index(url, entry)
+            return content
+
+        response.raise_for_status()
+        self.stats["misses"] += 1
+        count_cache("asset", "miss")
+        content = response.content
+        self._write_index(
+            url,
+            {
+                "sha256": self._write_blob(content),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_type": response.headers.get("Content-Type"),
+                "fetched_at": time.time(),
+            },
+        )
+        return content
+
+
+asset_store = AssetStore(ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES)
+
+
+def fetch_asset(url, timeout=ASSET_TIMEOUT, bounds=None):
+    # With bounds (max width, max height) the image comes back downsampled and
+    # recompressed for embedding
+    content = asset_store.fetch(url, timeout=timeout)
+    if bounds and IMAGE_OPTIMIZE:
+        content = asset_store.derived(
+            content,
+            "optimized_image",
+            [*bounds, IMAGE_JPEG_QUALITY],
+            lambda content: optimize_image(content, *bounds),
+        )
+    return content
+
+
+_prefetch_executor = ThreadPoolExecutor(
+    ASSET_PREFETCH_WORKERS, thread_name_prefix="asset-prefetch"
+)
+
+
+def collect_image_urls(data):
+    # Every http(s) value stored under a key ending in "URL" (logoURL, imageURL,
+    # and any per-slide image fields added later), in document order
+    urls = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if (
+                key.lower().endswith("url")
+                and isinstance(value, str)
+                and value.startswith(("http://", "https://"))
+            ):
+                urls.append(value)
+            else:
+                urls.extend(collect_image_urls(value))
+    elif isinstance(data, list):
+        for value in data:
+            urls.extend(collect_image_urls(value))
+    return list(dict.fromkeys(urls))
+
+
+def prefetch_assets(
+    data, timeout=ASSET_TIMEOUT, deadline=ASSET_PREFETCH_DEADLINE, known=None
+):
+    # Fetches all deck images in parallel and returns {url: bytes}, downsampled
+    # to slide (or logo) size. URLs that
+    # fail or miss the overall deadline are left out so the renderer falls back
+    # to the theme color; late downloads still land in the asset cache.
+    known = known or {}
+    urls = [url for url in collect_image_urls(data) if url not in known]
+    logo_url = data.get("logoURL") if isinstance(data, dict) else None
+    futures = {
+        _prefetch_executor.submit(
+            fetch_asset, url, timeout, LOGO_BOUNDS if url == logo_url else IMAGE_BOUNDS
+        ): url
+        for url in urls
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    for future in not_done:
+        future.cancel()
+
+    assets = dict(known)
+    for future in done:
+        url = futures[future]
+        try:
+            assets[url] = future.result()
+        except Exception as e:
+            print(f"Failed to fetch asset {url}:", e)
+    return assets
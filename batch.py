@@ -0,0 +1,104 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+
+from contextlib import contextmanager
+from pathlib import Path
+
+from files import atomic_path
+
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_DIR = Path(
+    os.environ.get("BATCH_DIR", str(Path(__file__).parent / ".cache" / "batches"))
+)
+
+
+def parse_leads(filename, content):
+    # Lead lists come as JSONL (one JSON object per line) or CSV with a header row
+    text = content.decode("utf-8-sig") if isinstance(content, bytes) else content
+    if filename.lower().endswith((".jsonl", ".ndjson")) or text.lstrip().startswith(
+        "{"
+    ):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    try:
+        return [
+            {key: value for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+            if any((value or "").strip() for value in row.values())
+        ]
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV: {e}") from e
+
+
+async def run_batch(
+    rows, create_deck, archive, concurrency=BATCH_CONCURRENCY, progress=None
+):
+    # Runs create_deck(row) -> (uuid, content, pptx_bytes) for every row with at
+    # most `concurrency` decks in flight. Each finished PPTX goes straight into
+    # `archive` (see open_batch_zip), so a batch never holds more decks in
+    # memory than are in flight. Failed rows are reported, not raised.
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+    # A ZipFile takes one write at a time
+    archive_lock = asyncio.Lock()
+    results = [None] * len(rows)
+    finished = 0
+    started_at = time.perf_counter()
+
+    async def run_row(index, row):
+        nonlocal finished
+        async with semaphore:
+            row_started_at = time.perf_counter()
+            try:
+                deck_uuid, _, pptx_content = await create_deck(row)
+                file = f"{index + 1:04d}-{deck_uuid}.pptx"
+                async with archive_lock:
+                    await asyncio.to_thread(archive.writestr, file, pptx_content)
+                results[index] = {
+                    "row": index,
+                    "status": "done",
+                    "uuid": deck_uuid,
+                    "pptx_url": f"/pptx/{deck_uuid}.pptx",
+                    "file": file,
+                }
+            except Exception as e:
+                results[index] = {"row": index, "status": "failed", "error": repr(e)}
+            results[index]["seconds"] = round(time.perf_counter() - row_started_at, 3)
+        finished += 1
+        if progress is not None:
+            await progress(f"generating {finished}/{len(rows)}")
+
+    await asyncio.gather(*(run_row(i, row) for i, row in enumerate(rows)))
+
+    elapsed = time.perf_counter() - started_at
+    done = sum(1 for result in results if result["status"] == "done")
+    summary = {
+        "rows": len(rows),
+        "done": done,
+        "failed": len(rows) - done,
+        "seconds": round(elapsed, 3),
+        "decks_per_minute": round(done / elapsed * 60, 2) if elapsed else 0.0,
+    }
+    return results, summary
+
+
+@contextmanager
+def open_batch_zip(batch_id):
+    # The batch zip: one stored (already compressed) PPTX per successful row,
+    # added by run_batch as each deck finishes, plus manifest.json. It only
+    # appears under BATCH_DIR once the block completes.
+    with atomic_path(BATCH_DIR / f"{batch_id}.zip") as tmp, zipfile.ZipFile(
+        tmp, "w", zipfile.ZIP_STORED
+    ) as archive:
+        yield archive
+
+
+def write_manifest(archive, results, summary):
+    manifest = {"summary": summary, "rows": results}
+    archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return manifest
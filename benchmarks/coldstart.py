@@ -0,0 +1,132 @@
+# Cold-start budget: times `import main` in fresh interpreters, the way a new
+# serverless instance starts, and fails (exit 1) when the median goes over the
+# budget or a module that is meant to load on first use is imported eagerly.
+#
+#   python -m benchmarks.coldstart [--runs 7] [--budget 1200] [--top 15]
+#
+# Run it in CI next to the deploy; the lazy-module check is independent of
+# how fast the machine is, the millisecond budget is not. tests/test_coldstart.py
+# runs the same checks under pytest.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+# Loaded by the first request that needs them, never by the import
+LAZY_MODULES = (
+    "pptx",
+    "lxml",
+    "PIL",
+    "supabase",
+    "requests",
+    "httpx",
+    "uvicorn",
+)
+COLDSTART_BUDGET_MS = float(os.environ.get("COLDSTART_BUDGET_MS", "1200"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({
+    "ms": (time.perf_counter() - start) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def import_once(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{result.stderr}")
+    probe = json.loads(result.stdout.splitlines()[-1])
+    # -X importtime lines: "import time: self | cumulative | name", indented
+    # by nesting and printed after their own imports, so main's direct
+    # imports (one level down) are the ones just before its line
+    children = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if name.startswith("   ") and not name.startswith("    "):
+            children[name.strip()] = int(parts[1]) / 1000
+        elif not name.startswith("  "):
+            if name.strip() == "main":
+                return probe["ms"], set(probe["modules"]), children
+            children = {}
+    return probe["ms"], set(probe["modules"]), {}
+
+
+def coldstart_env():
+    # The serverless configuration, without credentials: nothing may need
+    # them at import
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith(("SUPABASE_", "GEMINI_", "PEXELS_"))
+    }
+    env["DECK_FAST_START"] = "1"
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=COLDSTART_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = coldstart_env()
+
+    timings = []
+    eager = set()
+    slowest = {}
+    for _ in range(args.runs):
+        ms, modules, cumulative = import_once(env)
+        timings.append(ms)
+        eager.update(name for name in LAZY_MODULES if name in modules)
+        for name, module_ms in cumulative.items():
+            slowest.setdefault(name, []).append(module_ms)
+
+    median = statistics.median(timings)
+    print(
+        f"import main: {median:.0f} ms median, {min(timings):.0f}-"
+        f"{max(timings):.0f} ms over {args.runs} runs (budget {args.budget:.0f} ms)"
+    )
+    ranked = sorted(
+        ((statistics.median(values), name) for name, values in slowest.items()),
+        reverse=True,
+    )
+    for module_ms, name in ranked[: args.top]:
+        print(f"  {module_ms:8.1f} ms  {name}")
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(sorted(eager))}")
+        failed = True
+    if median > args.budget:
+        print(
+            f"FAIL: cold start {median:.0f} ms is over the {args.budget:.0f} ms budget"
+        )
+        failed = True
+    if failed:
+        raise SystemExit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
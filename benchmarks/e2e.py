@@ -0,0 +1,372 @@
+# End-to-end benchmark: the full create_deck pipeline (master prompt, image
+# prompt, Pexels search, image download, render, upload, insert) against the local fakes in
+# fakes.py, for every renderer and fixture deck size. Nothing leaves the machine.
+# Stages overlap, so per-stage times don't add up to end-to-end; the report
+# shows the most frequent critical path instead.
+#
+#   python -m benchmarks.e2e [--runs 20] [--concurrency 4] [--latency 0.05]
+#                            [--output bench.json] [--baseline old.json]
+#
+# --lazy times generation with DECK_LAZY_PPTX=1, where render and upload wait
+# for the first download. --context-cache turns on GEMINI_CONTEXT_CACHE, so
+# the master prompt's prefix goes through the fake's cachedContents.
+#
+# The JSON written by --output is stable across runs, so two commits can be
+# compared with --baseline or a plain diff.
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import re
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from io import BytesIO
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SIZES = {"small": 1, "medium": 2, "large": 4}
+STAGES = (
+    "master_prompt",
+    "image_prompt",
+    "image_search",
+    "hero_image",
+    "render_slides",
+    "image_download",
+    "render",
+    "upload",
+    "insert",
+)
+
+FILLER = (
+    "streamline operations with reliable tooling that keeps every crew safe "
+    "productive and ready for the next shift while cutting costs and paperwork"
+).split()
+WORDS_BY_KEY = {"title": 5, "name": 3, "headline": 6, "subtitle": 12, "testimonial": 35}
+
+
+def load_schema(path=ROOT / "prompts" / "master.txt"):
+    # The schema in the master prompt is written for the LLM, not a parser:
+    # tolerate trailing commas and a missing comma between two fields
+    text = path.read_text()
+    start = text.index("{", text.index("JSON Schema to Populate"))
+    end = text.index("Instructions:", start)
+    raw = text[start:end].strip()
+    raw = re.sub(r",(\s*[}\]])", r"\1", raw)
+    raw = re.sub(r'"\s*\n(\s*)"', '",\n\\1"', raw)
+    return json.loads(raw)
+
+
+def fill(key, value, index):
+    if isinstance(value, dict):
+        return {k: fill(k, v, index) for k, v in value.items()}
+    if isinstance(value, list):
+        return [fill(key, v, i) for i, v in enumerate(value)]
+    if key in ("type", "gender", "imageURL"):
+        return value
+    if key == "emoji":
+        return "🚀"
+    if key == "color":
+        return "#0070C0"
+    if key.lower().endswith(("url", "link")):
+        return f"https://example.com/{key.lower()}"
+    if key in ("firstName", "lastName"):
+        return f"Person{index}"
+    words = WORDS_BY_KEY.get(key, 25)
+    return " ".join(
+        FILLER[(index + i) % len(FILLER)] for i in range(words)
+    ).capitalize()
+
+
+def fixture_deck(schema, scale, logo_url=""):
+    # Every repeated section (features, benefits, ...) gets `scale` times the
+    # entries the schema shows
+    list_items = []
+    for item in schema["list"]:
+        item = dict(item)
+        for key, value in item.items():
+            if isinstance(value, list):
+                item[key] = value * scale
+        list_items.append(item)
+    deck = fill("deck", {**schema, "list": list_items}, 0)
+    deck["logoURL"] = logo_url
+    return deck
+
+
+def percentiles(values):
+    if not values:
+        return None
+    if len(values) == 1:
+        cuts = values * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49], 4),
+        "p95": round(cuts[94], 4),
+        "p99": round(cuts[98], 4),
+        "mean": round(statistics.fmean(values), 4),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(app):
+    import uvicorn
+
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def configure(args, workdir):
+    # Must run before the app modules are imported: they read config at import
+    for provider in ("gemini", "pexels", "supabase"):
+        os.environ[f"FAKE_{provider.upper()}_LATENCY"] = str(args.latency)
+    fakes = importlib.import_module("fakes")
+    urls = {
+        "gemini": serve(fakes.gemini_app),
+        "pexels": serve(fakes.pexels_app),
+        "supabase": serve(fakes.supabase_app),
+    }
+    os.environ.update(
+        {
+            "GEMINI_API_BASE": f"{urls['gemini']}/v1beta",
+            "GEMINI_API_KEY": "fake",
+            "GEMINI_CONTEXT_CACHE": (
+                "1" if getattr(args, "context_cache", False) else "0"
+            ),
+            "PEXELS_API_BASE": f"{urls['pexels']}/v1",
+            "PEXELS_API_KEY": "fake",
+            "SUPABASE_URL": urls["supabase"],
+            "SUPABASE_KEY": "fake",
+            # Cold path every run: no LLM or Pexels memo, fresh asset cache
+            "LLM_CACHE": "0",
+            "PEXELS_CACHE_TTL": "0",
+            "PEXELS_CACHE_DIR": "",
+            "ASSET_CACHE_DIR": str(Path(workdir) / "assets"),
+            # Fake decks repeat, so rendering is warm after the first run;
+            # set SLIDE_CACHE=0 to time every slide being drawn
+            "SLIDE_CACHE_DIR": str(Path(workdir) / "slides"),
+            "SAVE_DECKS_LOCALLY": "0",
+            "DECK_DEDUP_WINDOW": "0",
+            # Keep the outbound governors from throttling the benchmark itself
+            "GEMINI_RATE": "100000",
+            "GEMINI_BURST": "100000",
+            "PEXELS_RATE": "100000",
+            "PEXELS_BURST": "100000",
+        }
+    )
+    return fakes, urls
+
+
+async def run_case(main, renderer, runs, concurrency, stream):
+    semaphore = asyncio.Semaphore(concurrency)
+    end_to_end = []
+    stages = {stage: [] for stage in STAGES}
+    critical_paths = {}
+    sizes = []
+    errors = 0
+    runs_by_deck = {}
+
+    def record(run):
+        runs_by_deck[run.id] = run
+
+    async def one(index):
+        nonlocal errors
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                deck_uuid, _, pptx_content = await main.create_deck(
+                    f"COMPANY: Bench {index}\nPRODUCT: Suit\nLEAD: Lead {index}",
+                    main.no_progress,
+                    stream,
+                    renderer,
+                )
+            except Exception as e:
+                errors += 1
+                print(f"  run {index} failed: {e!r}")
+                return
+            finished_at = time.perf_counter()
+        end_to_end.append(finished_at - started_at)
+        if pptx_content is not None:
+            sizes.append(len(pptx_content))
+        run = runs_by_deck.pop(deck_uuid)
+        for stage, seconds in run.durations().items():
+            stages.setdefault(stage, []).append(seconds)
+        path = " > ".join(run.critical_path())
+        critical_paths[path] = critical_paths.get(path, 0) + 1
+
+    # One unrecorded deck first, so one-time costs (imports, template load,
+    # first image fetch) don't land in the percentiles
+    await main.create_deck("COMPANY: Warm-up", main.no_progress, stream, renderer)
+    for pipeline in main.deck_pipelines:
+        pipeline.hooks.append(record)
+    started_at = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(i) for i in range(runs)))
+    finally:
+        for pipeline in main.deck_pipelines:
+            pipeline.hooks.remove(record)
+    elapsed = time.perf_counter() - started_at
+    return {
+        "runs": runs,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_decks_per_s": round(len(end_to_end) / elapsed, 3),
+        "end_to_end": percentiles(end_to_end),
+        "stages": {stage: percentiles(values) for stage, values in stages.items()},
+        "critical_paths": dict(sorted(critical_paths.items(), key=lambda kv: -kv[1])),
+        "pptx_bytes": int(statistics.median(sizes)) if sizes else None,
+    }
+
+
+def render_profile(renderer, deck):
+    # Peak Python heap for one render, with the deck's images already fetched
+    from assets import prefetch_assets
+    from pptx import Presentation
+
+    assets = prefetch_assets(deck)
+    tracemalloc.start()
+    output = renderer.create(deck, assets=assets, output=BytesIO())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    output.seek(0)
+    return {"render_peak_bytes": peak, "slides": len(Presentation(output).slides)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def print_report(report, baseline=None):
+    previous = {}
+    for result in (baseline or {}).get("results", []):
+        previous[(result["renderer"], result["size"])] = result
+    print(
+        f"{'renderer':8} {'size':6} {'slides':>6} {'p50 s':>8} {'p95 s':>8} "
+        f"{'p99 s':>8} {'decks/s':>8} {'render p50':>10} {'peak MiB':>8} {'deck KiB':>8}"
+    )
+    for result in report["results"]:
+        e2e = result["end_to_end"] or {}
+        render = result["stages"].get("render") or {}
+        line = (
+            f"{result['renderer']:8} {result['size']:6} {result['slides']:>6} "
+            f"{e2e.get('p50', 0):8.3f} {e2e.get('p95', 0):8.3f} {e2e.get('p99', 0):8.3f} "
+            f"{result['throughput_decks_per_s']:8.2f} {render.get('p50', 0):10.4f} "
+            f"{result['render_peak_bytes'] / 2**20:8.1f} {(result['pptx_bytes'] or 0) / 1024:8.0f}"
+        )
+        old = previous.get((result["renderer"], result["size"]))
+        if old and old["end_to_end"] and e2e:
+            change = e2e["p50"] / old["end_to_end"]["p50"] - 1
+            line += f"  ({change:+.1%} p50 vs baseline)"
+        print(line)
+        paths = result.get("critical_paths") or {}
+        if paths:
+            path, count = next(iter(paths.items()))
+            print(f"{'':15} critical path {path} ({count}/{result['runs']})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="fake provider delay (s)"
+    )
+    parser.add_argument("--renderers", default="v1,v2,v3")
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--lazy", action="store_true")
+    parser.add_argument("--context-cache", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare with")
+    args = parser.parse_args()
+
+    if args.lazy:
+        os.environ["DECK_LAZY_PPTX"] = "1"
+    workdir = tempfile.mkdtemp(prefix="deck-bench-")
+    fakes, urls = configure(args, workdir)
+    main_module = importlib.import_module("main")
+    from ai import close_async_client
+    from renderer import get_renderer
+
+    schema = load_schema()
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+            "concurrency": args.concurrency,
+            "latency": args.latency,
+            "stream": args.stream,
+            "lazy": args.lazy,
+        },
+        "results": [],
+    }
+
+    async def run_all():
+        for size in args.sizes.split(","):
+            deck = fixture_deck(
+                schema, SIZES[size], logo_url=f"{urls['pexels']}/logo.png"
+            )
+            fakes.gemini_state["deck"] = deck
+            for name in args.renderers.split(","):
+                renderer = get_renderer(name)
+                print(f"{name} / {size} ...")
+                result = await run_case(
+                    main_module, name, args.runs, args.concurrency, args.stream
+                )
+                rendered = {
+                    **deck,
+                    "list": [
+                        {
+                            **deck["list"][0],
+                            "imageURL": f"{urls['pexels']}/photos/hero.jpeg",
+                        },
+                        *deck["list"][1:],
+                    ],
+                }
+                profile = await asyncio.to_thread(render_profile, renderer, rendered)
+                report["results"].append(
+                    {"renderer": name, "size": size, **result, **profile}
+                )
+        await main_module.deck_store.close()
+        await close_async_client()
+
+    asyncio.run(run_all())
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(report, baseline)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True))
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Before/after for the image pipeline: deck size and render time with the
+# original Pexels photo and PNG logo embedded as-is, versus the chosen src
+# variant downsampled and recompressed by image_optimizer.
+#
+#   python -m benchmarks.images [--runs 10] [--renderers v1,v2,v3]
+import argparse
+import statistics
+import time
+
+from io import BytesIO
+
+from fakes import (
+    FAKE_IMAGE_SIZE,
+    PEXELS_VARIANT_BOXES,
+    SAMPLE_DECK,
+    fake_image,
+    fake_logo,
+)
+from image_optimizer import IMAGE_BOUNDS, LOGO_BOUNDS, optimize_image
+from img import choose_pexels_src
+from renderer import get_renderer
+
+
+HERO_URL = "https://images.example.com/hero.jpeg"
+LOGO_URL = "https://images.example.com/logo.png"
+
+
+def render(renderer, deck, assets, runs):
+    timings = []
+    for _ in range(runs):
+        output = BytesIO()
+        start = time.perf_counter()
+        renderer.create(deck, assets=assets, output=output)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--renderers", default="v1,v2,v3")
+    args = parser.parse_args()
+
+    width, height = FAKE_IMAGE_SIZE
+    photo = {
+        "width": width,
+        "height": height,
+        "src": {variant: variant for variant in PEXELS_VARIANT_BOXES},
+    }
+    variant = choose_pexels_src(photo)
+    original_hero, original_logo = fake_image("original"), fake_logo()
+
+    start = time.perf_counter()
+    hero = optimize_image(fake_image(variant), *IMAGE_BOUNDS)
+    logo = optimize_image(original_logo, *LOGO_BOUNDS)
+    optimize_ms = (time.perf_counter() - start) * 1000
+
+    deck = {**SAMPLE_DECK, "logoURL": LOGO_URL}
+    deck["list"] = [{**deck["list"][0], "imageURL": HERO_URL}, *deck["list"][1:]]
+    before = {HERO_URL: original_hero, LOGO_URL: original_logo}
+    after = {HERO_URL: hero, LOGO_URL: logo}
+
+    print(
+        f"hero: original {len(original_hero) / 1024:8.0f} KiB -> "
+        f"{variant} optimized {len(hero) / 1024:6.0f} KiB"
+    )
+    print(
+        f"logo: original {len(original_logo) / 1024:8.0f} KiB -> "
+        f"optimized {len(logo) / 1024:6.0f} KiB"
+    )
+    print(f"one-time optimize cost:   {optimize_ms:8.1f} ms (cached per image)")
+    print(
+        f"{'renderer':8} {'before KiB':>10} {'after KiB':>10} {'before ms':>10} {'after ms':>10}"
+    )
+    for name in args.renderers.split(","):
+        renderer = get_renderer(name)
+        before_ms, before_bytes = render(renderer, deck, before, args.runs)
+        after_ms, after_bytes = render(renderer, deck, after, args.runs)
+        print(
+            f"{name:8} {before_bytes / 1024:10.0f} {after_bytes / 1024:10.0f} "
+            f"{before_ms:10.1f} {after_ms:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
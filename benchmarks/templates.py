@@ -0,0 +1,49 @@
+# Micro-benchmark: cost of starting a deck from the default template.
+#
+#   python -m benchmarks.templates [--runs 200]
+import argparse
+import statistics
+import time
+
+from pptx import Presentation
+
+from pptx_templates import TemplateManager
+
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    manager = TemplateManager()
+    start = time.perf_counter()
+    manager.load()
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    cold_median, cold_mean = measure(Presentation, args.runs)
+    warm_median, warm_mean = measure(manager.new, args.runs)
+
+    print(f"one-time template load:     {warmup_ms:8.2f} ms")
+    print(
+        f"Presentation() per deck:    {cold_median:8.2f} ms median, {cold_mean:.2f} ms mean"
+    )
+    print(
+        f"TemplateManager.new():      {warm_median:8.2f} ms median, {warm_mean:.2f} ms mean"
+    )
+    print(
+        f"saved per deck:             {cold_median - warm_median:8.2f} ms "
+        f"({cold_median / warm_median:.1f}x faster)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+
+from files import write_atomic
+from metrics import count_cache
+
+
+# Each on-disk cache keeps at most this many entries; expired and then the
+# oldest entries are removed by prune(), which runs after the first set() in
+# a process and then every DISK_CACHE_PRUNE_EVERY sets
+DISK_CACHE_MAX_ENTRIES = int(os.environ.get("DISK_CACHE_MAX_ENTRIES", "10000"))
+DISK_CACHE_PRUNE_EVERY = int(os.environ.get("DISK_CACHE_PRUNE_EVERY", "256"))
+
+
+def make_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            created, value = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskCache:
+    def __init__(
+        self,
+        directory,
+        ttl=None,
+        max_entries=DISK_CACHE_MAX_ENTRIES,
+        prune_every=DISK_CACHE_PRUNE_EVERY,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._sets_until_prune = 1
+        self._prune_lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return default
+        if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            path.unlink(missing_ok=True)
+            return default
+        return entry["value"]
+
+    def set(self, key, value):
+        # Concurrent workers never read a partial entry
+        write_atomic(
+            self._path(key), json.dumps({"created": time.time(), "value": value})
+        )
+        self._sets_until_prune -= 1
+        if self._sets_until_prune <= 0:
+            self._sets_until_prune = self.prune_every
+            # In the background: set() is called from the event loop too
+            threading.Thread(target=self.prune, daemon=True).start()
+
+    def delete(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def prune(self):
+        # Removes expired entries, then the oldest ones over max_entries. Entries
+        # are only written by set(), so a file's mtime is its creation time.
+        # Skipped while another thread is pruning the same cache.
+        if not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    entries.append((path.stat().st_mtime, path))
+                except OSError:
+                    continue
+            entries.sort()
+            now = time.time()
+            expired = 0
+            if self.ttl is not None:
+                while expired < len(entries) and now - entries[expired][0] > self.ttl:
+                    expired += 1
+            over = max(0, len(entries) - expired - self.max_entries)
+            for _, path in entries[: expired + over]:
+                path.unlink(missing_ok=True)
+            return expired + over
+        finally:
+            self._prune_lock.release()
+
+
+class TieredCache:
+    def __init__(self, memory, disk=None, name=None):
+        self.memory = memory
+        self.disk = disk
+        self.name = name
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            self._count("memory")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                self._count("disk")
+                self.memory.set(key, value)
+                return value
+        self.stats["misses"] += 1
+        self._count("miss")
+        return default
+
+    def _count(self, result):
+        if self.name:
+            count_cache(self.name, result)
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
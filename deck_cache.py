@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+
+from pathlib import Path
+
+from cache import LRUCache
+from files import write_atomic
+from metrics import count_cache
+
+
+DECK_CACHE_DIR = Path(
+    os.environ.get("DECK_CACHE_DIR", str(Path(__file__).parent / ".cache" / "decks"))
+)
+DECK_CACHE_MAX_BYTES = int(os.environ.get("DECK_CACHE_MAX_BYTES", str(1 << 30)))
+DECK_META_TTL = float(os.environ.get("DECK_META_TTL", "300"))
+
+
+class DeckFileCache:
+    # Bounded on-disk cache of downloaded decks (pptx_filename -> file). File
+    # mtime is refreshed on every hit and used for LRU eviction, so the cache is
+    # shared safely by all worker processes on the same host.
+    def __init__(self, directory=DECK_CACHE_DIR, max_bytes=DECK_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.etags = LRUCache(4096)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def _path(self, filename):
+        path = self.directory / filename
+        if path.parent != self.directory:
+            raise ValueError(f"Invalid deck filename: {filename}")
+        return path
+
+    def get(self, filename):
+        path = self._path(filename)
+        try:
+            os.utime(path)
+        except OSError:
+            self.stats["misses"] += 1
+            count_cache("deck_file", "miss")
+            return None
+        self.stats["hits"] += 1
+        count_cache("deck_file", "hit")
+        return path
+
+    def put(self, filename, content):
+        path = self._path(filename)
+        write_atomic(path, content)
+        self._evict(keep=path)
+        return path
+
+    def etag(self, path):
+        # Deck files are immutable per filename; mtime changes on every hit
+        key = (path.name, path.stat().st_size)
+        etag = self.etags.get(key)
+        if etag is None:
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            etag = f'"{digest[:32]}"'
+            self.etags.set(key, etag)
+        return etag
+
+    def _evict(self, keep=None):
+        with self._lock:
+            files = []
+            total = 0
+            for path in self.directory.glob("*.pptx"):
+                stat = path.stat()
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+                self.stats["evictions"] += 1
+
+
+deck_files = DeckFileCache()
+# uuid -> pptx_filename, saves the decks2 table lookup on repeat downloads
+deck_meta = LRUCache(10000, ttl=DECK_META_TTL)
@@ -0,0 +1,297 @@
+import copy
+import json
+import re
+
+from typing import Annotated, Literal, Union, get_args, get_origin
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
+
+
+# Typed mirror of the JSON schema in prompts/master.txt. Renderers still take
+# the validated deck as a plain dict (model_dump), so every key they read is
+# guaranteed to be present with the right type.
+
+
+class DeckModel(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+
+class Feature(DeckModel):
+    title: str
+    emoji: str = ""
+    description: str
+
+
+class Benefit(DeckModel):
+    name: str
+    emoji: str = ""
+    description: str
+
+
+class Explanation(DeckModel):
+    title: str
+    description: str
+    emoji: str = ""
+
+
+class Testimonial(DeckModel):
+    firstName: str
+    lastName: str
+    gender: str = ""
+    testimonial: str
+
+
+class HeroSlide(DeckModel):
+    type: Literal["HERO"]
+    title: str
+    subtitle: str
+    imageURL: str = ""
+
+
+class FeaturesSlide(DeckModel):
+    type: Literal["FEATURES"]
+    title: str
+    features: list[Feature]
+
+
+class BenefitsSlide(DeckModel):
+    type: Literal["BENEFITS"]
+    title: str
+    benefits: list[Benefit]
+
+
+class ExplanationSlide(DeckModel):
+    type: Literal["EXPLANATION"]
+    title: str = ""
+    explanations: list[Explanation]
+
+
+class TestimonialsSlide(DeckModel):
+    type: Literal["TESTIMONIALS"]
+    testimonials: list[Testimonial]
+
+
+class CtaSlide(DeckModel):
+    type: Literal["CTA"]
+    headline: str
+    description: str
+    link: str = ""
+    homepageLink: str = ""
+
+
+Slide = Annotated[
+    Union[
+        HeroSlide,
+        FeaturesSlide,
+        BenefitsSlide,
+        ExplanationSlide,
+        TestimonialsSlide,
+        CtaSlide,
+    ],
+    Field(discriminator="type"),
+]
+
+
+class Deck(DeckModel):
+    logoURL: str = ""
+    color: str = ""
+    list: list[Slide]
+
+
+SLIDE_MODELS = {
+    get_args(model.model_fields["type"].annotation)[0]: model
+    for model in get_args(get_args(Slide)[0])
+}
+# Near misses the LLM produces for slide types
+SLIDE_TYPE_ALIASES = {
+    "FEATURE": "FEATURES",
+    "BENEFIT": "BENEFITS",
+    "EXPLANATIONS": "EXPLANATION",
+    "TESTIMONIAL": "TESTIMONIALS",
+    "CALL_TO_ACTION": "CTA",
+}
+# Fixes applied to one slide before it is given up on
+MAX_REPAIR_ROUNDS = 3
+
+slide_adapter = TypeAdapter(Slide)
+
+
+class DeckError(ValueError):
+    pass
+
+
+def gemini_schema(model):
+    # Gemini responseSchema (an OpenAPI 3.0 subset) for a pydantic model. The
+    # API has no oneOf, so a discriminated union becomes one object with the
+    # union of the variants' properties; the models still enforce each variant.
+    schema = model.model_json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+
+def _convert(schema, defs):
+    if "$ref" in schema:
+        return _convert(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    variants = schema.get("oneOf") or schema.get("anyOf")
+    if variants:
+        converted = [_convert(variant, defs) for variant in variants]
+        return _merge_objects(converted)
+    if "const" in schema:
+        return {"type": "STRING", "enum": [schema["const"]]}
+    if "enum" in schema:
+        return {"type": "STRING", "enum": list(schema["enum"])}
+
+    kind = schema.get("type", "string")
+    if kind == "object":
+        properties = {
+            name: _convert(value, defs)
+            for name, value in schema.get("properties", {}).items()
+        }
+        result = {"type": "OBJECT", "properties": properties}
+        if schema.get("required"):
+            result["required"] = list(schema["required"])
+        # Keeps logoURL and color ahead of list for the streaming parser
+        result["propertyOrdering"] = list(properties)
+        return result
+    if kind == "array":
+        return {"type": "ARRAY", "items": _convert(schema.get("items", {}), defs)}
+    return {"type": kind.upper()}
+
+
+def _merge_objects(variants):
+    merged = {"type": "OBJECT", "properties": {}}
+    required = None
+    for variant in variants:
+        for name, value in variant.get("properties", {}).items():
+            existing = merged["properties"].get(name)
+            if existing and "enum" in existing and "enum" in value:
+                existing["enum"] = existing["enum"] + [
+                    option for option in value["enum"] if option not in existing["enum"]
+                ]
+            elif existing is None:
+                merged["properties"][name] = dict(value)
+        names = set(variant.get("required", []))
+        required = names if required is None else required & names
+    if required:
+        merged["required"] = [name for name in merged["properties"] if name in required]
+    merged["propertyOrdering"] = list(merged["properties"])
+    return merged
+
+
+DECK_RESPONSE_SCHEMA = gemini_schema(Deck)
+SLIDE_RESPONSE_SCHEMAS = {
+    slide_type: gemini_schema(model) for slide_type, model in SLIDE_MODELS.items()
+}
+
+
+def parse_deck(text):
+    # Returns (deck dict, repaired). The fast path parses and validates in one
+    # pass in pydantic-core; anything else goes through the repair pass, and
+    # DeckError means the response has to be regenerated.
+    try:
+        return Deck.model_validate_json(text).model_dump(), False
+    except ValidationError:
+        pass
+    return repair_deck(loads_lenient(text)), True
+
+
+def parse_slide(item):
+    # One streamed deck item: validated dict, or None if it can't be repaired
+    try:
+        return slide_adapter.validate_python(item).model_dump()
+    except ValidationError:
+        return repair_slide(item)
+
+
+def loads_lenient(text):
+    # JSON wrapped in Markdown fences or prose, or with trailing commas
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise DeckError("No JSON object in response")
+    raw = text[start : end + 1]
+    for candidate in (raw, re.sub(r",(\s*[}\]])", r"\1", raw)):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    raise DeckError("Response is not valid JSON")
+
+
+def repair_deck(data):
+    if isinstance(data, list):
+        data = {"list": data}
+    if not isinstance(data, dict):
+        raise DeckError("Deck is not a JSON object")
+    slides = data.get("list")
+    if not isinstance(slides, list):
+        raise DeckError("Deck has no slide list")
+    repaired = [repair_slide(slide) for slide in slides]
+    deck = {
+        "logoURL": _as_text(data.get("logoURL")),
+        "color": _as_text(data.get("color")),
+        # Slides of an unknown type would be skipped by every renderer anyway
+        "list": [slide for slide in repaired if slide is not None],
+    }
+    if not deck["list"]:
+        raise DeckError("Deck has no usable slides")
+    return Deck.model_validate(deck).model_dump()
+
+
+def repair_slide(slide):
+    # Validated slide dict, or None if it can't be repaired: missing text
+    # becomes "", numbers and lists become text, a lone object becomes a
+    # one-item list, and slide type near misses are normalized
+    if not isinstance(slide, dict):
+        return None
+    slide = copy.deepcopy(slide)
+    slide_type = str(slide.get("type", "")).strip().upper().replace(" ", "_")
+    slide["type"] = SLIDE_TYPE_ALIASES.get(slide_type, slide_type)
+    model = SLIDE_MODELS.get(slide["type"])
+    if model is None:
+        return None
+    for _ in range(MAX_REPAIR_ROUNDS):
+        try:
+            return model.model_validate(slide).model_dump()
+        except ValidationError as e:
+            if not all(_fix(model, slide, error) for error in e.errors()):
+                return None
+    return None
+
+
+def _fix(model, slide, error):
+    *parents, key = error["loc"]
+    container = slide
+    for part in parents:
+        container = container[part]
+    annotation = _annotation(model, error["loc"])
+    if error["type"] == "missing":
+        container[key] = [] if get_origin(annotation) is list else ""
+    elif error["type"] == "string_type":
+        container[key] = _as_text(error["input"])
+    elif error["type"] == "list_type" and isinstance(error["input"], dict):
+        container[key] = [error["input"]]
+    elif error["type"] == "list_type" and error["input"] is None:
+        container[key] = []
+    else:
+        return False
+    return True
+
+
+def _annotation(model, loc):
+    annotation = None
+    for part in loc:
+        if isinstance(part, int):
+            annotation = get_args(annotation)[0]
+            model = annotation
+            continue
+        annotation = model.model_fields[part].annotation
+        model = annotation
+    return annotation
+
+
+def _as_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(_as_text(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
@@ -0,0 +1,35 @@
+import json
+import os
+import unicodedata
+
+from datetime import datetime, timedelta, timezone
+
+from cache import make_key
+
+
+# Identical inputs within this many seconds get the existing deck back instead
+# of a new generation; 0 disables deduplication. Needs the input_hash column
+# from migrations/002_decks2_input_hash.sql.
+DECK_DEDUP_WINDOW = float(os.environ.get("DECK_DEDUP_WINDOW", "0"))
+
+
+def normalize_input(input):
+    # Free-text input: same text modulo line endings, trailing whitespace and
+    # Unicode composition. JSON input: same data regardless of key order.
+    if isinstance(input, str):
+        text = unicodedata.normalize("NFC", input)
+        text = text.replace("\r\n", "\n").replace("\r", "\n").strip()
+        return "\n".join(line.rstrip() for line in text.split("\n"))
+    return json.dumps(input, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def input_fingerprint(input, *context):
+    # context: anything else that changes the output (renderer, prompt versions)
+    return make_key("deck-input", normalize_input(input), *context)
+
+
+async def find_recent_deck(store, input_hash, window=DECK_DEDUP_WINDOW):
+    # Newest decks2 row with this fingerprint inside the window (see
+    # DeckStore.recent_deck)
+    since = (datetime.now(timezone.utc) - timedelta(seconds=window)).isoformat()
+    return await store.recent_deck(input_hash, since)
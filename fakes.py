@@ -0,0 +1,391 @@
+# Local stand-ins for the external providers, for development and benchmarks.
+#
+#   uvicorn fakes:gemini_app --port 8001
+#   uvicorn fakes:pexels_app --port 8002
+#   uvicorn fakes:supabase_app --port 8003
+#   GEMINI_API_BASE=http://127.0.0.1:8001/v1beta GEMINI_API_KEY=fake \
+#   PEXELS_API_BASE=http://127.0.0.1:8002/v1 \
+#   SUPABASE_URL=http://127.0.0.1:8003 SUPABASE_KEY=fake python main.py
+#
+# FAKE_LATENCY adds a fixed delay (seconds) to every response; FAKE_GEMINI_LATENCY,
+# FAKE_PEXELS_LATENCY and FAKE_SUPABASE_LATENCY override it per provider.
+import asyncio
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image
+
+
+FAKE_LATENCY = float(os.environ.get("FAKE_LATENCY", "0"))
+fake_latency = {
+    provider: float(os.environ.get(f"FAKE_{provider.upper()}_LATENCY", FAKE_LATENCY))
+    for provider in ("gemini", "pexels", "supabase")
+}
+# Width x height of the "original" fake Pexels photo
+FAKE_IMAGE_SIZE = tuple(
+    int(n) for n in os.environ.get("FAKE_IMAGE_SIZE", "4000x2667").split("x")
+)
+
+SAMPLE_DECK = {
+    "logoURL": "",
+    "color": "#0070C0",
+    "list": [
+        {
+            "type": "HERO",
+            "title": "Safer Shifts for Every Crew",
+            "subtitle": "Protective gear built around how your firefighters work",
+            "imageURL": "",
+        },
+        {
+            "type": "FEATURES",
+            "title": "Built for the Fireground",
+            "features": [
+                {
+                    "title": "Heat Shield",
+                    "emoji": "🔥",
+                    "description": "Layered thermal barrier.",
+                },
+                {
+                    "title": "Light Frame",
+                    "emoji": "🪶",
+                    "description": "Less weight per shift.",
+                },
+                {
+                    "title": "Smart Sensors",
+                    "emoji": "📡",
+                    "description": "Live vitals to command.",
+                },
+            ],
+        },
+        {
+            "type": "CTA",
+            "headline": "Book a Fitting",
+            "description": "See the suit on your own crew.",
+            "link": "https://example.com/demo",
+            "homepageLink": "https://example.com",
+        },
+    ],
+}
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def fake_completion(prompt, json_mode=False):
+    if "SLIDE INDEX:" in prompt:
+        # Single-slide rewrite: the matching slide of the fake deck, retitled
+        slides = gemini_state["deck"]["list"]
+        index = int(prompt.split("SLIDE INDEX:")[1].split()[0]) % len(slides)
+        slide = {
+            key: f"{value} (rewritten)" if key in ("title", "headline") else value
+            for key, value in slides[index].items()
+        }
+        return json.dumps(slide)
+    if "JSON Schema" in prompt:
+        deck = json.dumps(gemini_state["deck"], indent=2)
+        # Without a responseSchema the real model tends to wrap JSON in a fence
+        return deck if json_mode else "```json\n" + deck + "\n```"
+    return "firefighters in modern protective gear"
+
+
+gemini_app = FastAPI()
+gemini_state = {
+    "deck": SAMPLE_DECK,  # what the master prompt returns
+    "cached_contents": {},
+    # Prefixes below this size are refused, like the real API's minimum
+    "min_cached_tokens": int(os.environ.get("FAKE_GEMINI_MIN_CACHED_TOKENS", "0")),
+    "requests": 0,
+    "prompt_tokens": 0,
+    "cached_tokens": 0,
+}
+
+
+def _prompt_text(body):
+    return "".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+@gemini_app.post("/v1beta/cachedContents")
+async def create_cached_content(request: Request):
+    body = await request.json()
+    await asyncio.sleep(fake_latency["gemini"])
+    name = f"cachedContents/{uuid.uuid4().hex}"
+    ttl = float(body.get("ttl", "3600s").rstrip("s"))
+    text = _prompt_text(body)
+    if estimate_tokens(text) < gemini_state["min_cached_tokens"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cached content is too small: minimum is "
+            f"{gemini_state['min_cached_tokens']} tokens",
+        )
+    gemini_state["cached_contents"][name] = {
+        "text": text,
+        "expires_at": time.time() + ttl,
+    }
+    expire_time = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    return {
+        "name": name,
+        "model": body.get("model"),
+        "expireTime": expire_time.isoformat(),
+        "usageMetadata": {"totalTokenCount": estimate_tokens(text)},
+    }
+
+
+@gemini_app.post("/v1beta/models/{target}")
+async def generate_content(target: str, request: Request):
+    _, _, method = target.partition(":")
+    body = await request.json()
+    prompt = _prompt_text(body)
+    cached_text = ""
+    if body.get("cachedContent"):
+        cached = gemini_state["cached_contents"].get(body["cachedContent"])
+        if cached is None or cached["expires_at"] < time.time():
+            raise HTTPException(status_code=404, detail="CachedContent not found")
+        cached_text = cached["text"]
+
+    gemini_state["requests"] += 1
+    gemini_state["prompt_tokens"] += estimate_tokens(prompt)
+    gemini_state["cached_tokens"] += estimate_tokens(cached_text) if cached_text else 0
+    usage = {
+        "promptTokenCount": estimate_tokens(cached_text + prompt),
+        "cachedContentTokenCount": estimate_tokens(cached_text) if cached_text else 0,
+    }
+    await asyncio.sleep(fake_latency["gemini"])
+    json_mode = (
+        body.get("generationConfig", {}).get("responseMimeType") == "application/json"
+    )
+    text = fake_completion(cached_text + prompt, json_mode)
+
+    def response(chunk):
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}],
+            "usageMetadata": usage,
+        }
+
+    if method == "streamGenerateContent":
+
+        async def events():
+            for i in range(0, len(text), 64):
+                yield f"data: {json.dumps(response(text[i : i + 64]))}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+    if method != "generateContent":
+        raise HTTPException(status_code=404, detail=f"Unknown method {method}")
+    return response(text)
+
+
+@gemini_app.get("/fake/stats")
+async def gemini_stats():
+    return {
+        key: value
+        for key, value in gemini_state.items()
+        if key not in ("cached_contents", "deck", "min_cached_tokens")
+    }
+
+
+pexels_app = FastAPI()
+pexels_state = {"searches": 0, "downloads": 0, "bytes": 0}
+# The boxes Pexels' CDN scales each src variant into (None = unconstrained)
+PEXELS_VARIANT_BOXES = {
+    "original": (None, None),
+    "large2x": (1880, 1300),
+    "large": (940, 650),
+    "medium": (None, 350),
+    "small": (None, 130),
+}
+_fake_images = {}
+
+
+def fake_image(variant="original"):
+    if variant not in _fake_images:
+        width, height = FAKE_IMAGE_SIZE
+        max_width, max_height = PEXELS_VARIANT_BOXES.get(variant, (None, None))
+        scale = min(1.0, (max_width or width) / width, (max_height or height) / height)
+        # Noise compresses like a photo, unlike a flat colour
+        image = Image.effect_noise(
+            (round(width * scale), round(height * scale)), 64
+        ).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        _fake_images[variant] = buffer.getvalue()
+    return _fake_images[variant]
+
+
+def fake_logo():
+    # An oversized transparent PNG, the way logos often arrive
+    if "logo" not in _fake_images:
+        image = Image.new("RGBA", (2000, 2000), (0, 0, 0, 0))
+        noise = Image.effect_noise((1600, 1600), 96).convert("RGBA")
+        image.paste(noise, (200, 200))
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        _fake_images["logo"] = buffer.getvalue()
+    return _fake_images["logo"]
+
+
+def _image_response(request, content, media_type):
+    etag = f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    pexels_state["downloads"] += 1
+    pexels_state["bytes"] += len(content)
+    return Response(content, media_type=media_type, headers={"ETag": etag})
+
+
+@pexels_app.get("/v1/search")
+async def pexels_search(request: Request, query: str = "", per_page: int = 1):
+    await asyncio.sleep(fake_latency["pexels"])
+    pexels_state["searches"] += 1
+    # A fresh photo id per search, so benchmarks exercise the download path
+    base = f"{str(request.base_url).rstrip('/')}/photos/{uuid.uuid4().hex}.jpeg"
+    width, height = FAKE_IMAGE_SIZE
+    photo = {
+        "id": pexels_state["searches"],
+        "width": width,
+        "height": height,
+        "alt": query,
+        "src": {
+            variant: f"{base}?variant={variant}" for variant in PEXELS_VARIANT_BOXES
+        },
+    }
+    return {"total_results": 1, "page": 1, "per_page": per_page, "photos": [photo]}
+
+
+@pexels_app.get("/photos/{name}")
+async def pexels_photo(name: str, request: Request, variant: str = "original"):
+    await asyncio.sleep(fake_latency["pexels"])
+    content = await asyncio.to_thread(fake_image, variant)
+    return _image_response(request, content, "image/jpeg")
+
+
+@pexels_app.get("/logo.png")
+async def fake_logo_png(request: Request):
+    await asyncio.sleep(fake_latency["pexels"])
+    content = await asyncio.to_thread(fake_logo)
+    return _image_response(request, content, "image/png")
+
+
+@pexels_app.get("/fake/stats")
+async def pexels_stats():
+    return pexels_state
+
+
+supabase_app = FastAPI()
+supabase_state = {"objects": {}, "tables": {}}
+
+
+@supabase_app.post("/storage/v1/object/{bucket}/{path:path}")
+async def storage_upload(bucket: str, path: str, request: Request):
+    content = await request.body()
+    await asyncio.sleep(fake_latency["supabase"])
+    supabase_state["objects"][f"{bucket}/{path}"] = content
+    return {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid4())}
+
+
+@supabase_app.get("/storage/v1/object/{bucket}/{path:path}")
+async def storage_download(bucket: str, path: str):
+    await asyncio.sleep(fake_latency["supabase"])
+    content = supabase_state["objects"].get(f"{bucket}/{path}")
+    if content is None:
+        raise HTTPException(status_code=404, detail="Object not found")
+    return Response(content, media_type="application/octet-stream")
+
+
+@supabase_app.delete("/storage/v1/object/{bucket}")
+async def storage_remove(bucket: str, request: Request):
+    body = await request.json()
+    await asyncio.sleep(fake_latency["supabase"])
+    removed = []
+    for path in body.get("prefixes", []):
+        if supabase_state["objects"].pop(f"{bucket}/{path}", None) is not None:
+            removed.append({"name": path})
+    return removed
+
+
+@supabase_app.post("/rest/v1/{table}")
+async def table_insert(table: str, request: Request):
+    body = await request.json()
+    await asyncio.sleep(fake_latency["supabase"])
+    rows = body if isinstance(body, list) else [body]
+    for row in rows:
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+    supabase_state["tables"].setdefault(table, []).extend(rows)
+    return Response(json.dumps(rows), status_code=201, media_type="application/json")
+
+
+TABLE_FILTERS = {
+    "eq": lambda value, operand: value == operand,
+    "gt": lambda value, operand: value > operand,
+    "gte": lambda value, operand: value >= operand,
+    "lt": lambda value, operand: value < operand,
+    "lte": lambda value, operand: value <= operand,
+}
+
+
+def filter_rows(rows, params):
+    for column, value in params.items():
+        op, _, operand = value.partition(".")
+        if column in ("select", "order", "limit") or op not in TABLE_FILTERS:
+            continue
+        compare = TABLE_FILTERS[op]
+        rows = [row for row in rows if compare(str(row.get(column)), operand)]
+    return rows
+
+
+@supabase_app.get("/rest/v1/{table}")
+async def table_select(table: str, request: Request):
+    # Supports the eq/gt/gte/lt/lte filters, order and limit the app uses
+    # (compared as strings, which holds for ISO timestamps); other params are
+    # ignored
+    await asyncio.sleep(fake_latency["supabase"])
+    params = request.query_params
+    rows = filter_rows(supabase_state["tables"].get(table, []), params)
+    if "order" in params:
+        column, _, direction = params["order"].partition(".")
+        rows = sorted(
+            rows,
+            key=lambda row: str(row.get(column)),
+            reverse=direction.startswith("desc"),
+        )
+    if "limit" in params:
+        rows = rows[: int(params["limit"])]
+    return rows
+
+
+@supabase_app.patch("/rest/v1/{table}")
+async def table_update(table: str, request: Request):
+    body = await request.json()
+    await asyncio.sleep(fake_latency["supabase"])
+    updated = filter_rows(supabase_state["tables"].get(table, []), request.query_params)
+    for row in updated:
+        row.update(body)
+    return updated
+
+
+@supabase_app.delete("/rest/v1/{table}")
+async def table_delete(table: str, request: Request):
+    await asyncio.sleep(fake_latency["supabase"])
+    rows = supabase_state["tables"].get(table, [])
+    removed = filter_rows(rows, request.query_params)
+    supabase_state["tables"][table] = [row for row in rows if row not in removed]
+    return removed
+
+
+@supabase_app.get("/fake/stats")
+async def supabase_stats():
+    return {
+        "objects": len(supabase_state["objects"]),
+        "bytes": sum(len(content) for content in supabase_state["objects"].values()),
+        "rows": {table: len(rows) for table, rows in supabase_state["tables"].items()},
+    }
@@ -0,0 +1,30 @@
+import os
+import threading
+
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_path(path):
+    # A temporary path next to `path` that replaces it once the block succeeds,
+    # so readers in any worker process see the old file or the complete new
+    # one, never a partial write. The ".tmp" name is unique per process and
+    # thread, so concurrent writers of the same file don't collide.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_atomic(path, content):
+    # Writes str or bytes content through atomic_path()
+    with atomic_path(path) as tmp:
+        if isinstance(content, str):
+            tmp.write_text(content)
+        else:
+            tmp.write_bytes(content)
@@ -0,0 +1,246 @@
+import asyncio
+import email.utils
+import math
+import os
+import random
+import threading
+import time
+
+from collections import deque
+from functools import cache
+
+from metrics import (
+    outbound_calls,
+    outbound_failures,
+    outbound_retries,
+    outbound_throttled,
+)
+
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+THROTTLE_STATUS = (429, 503)
+
+
+@cache
+def retryable_errors():
+    # Evaluated by the except clauses only once an attempt raises, so importing
+    # the governor doesn't import both HTTP clients
+    import httpx
+    import requests
+
+    return (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        httpx.TransportError,
+    )
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Takes one token and returns how long the caller must wait before using it
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class AdaptiveLimiter:
+    # AIMD concurrency limit: grows by ~1 per window of successful calls and
+    # halves whenever the provider throttles us. Shared by threads and coroutines.
+    def __init__(self, initial, minimum=1, maximum=64):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiters = deque()
+
+    def _try_acquire(self):
+        if self.in_flight < math.floor(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            await future
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, deque()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class Governor:
+    # Outbound call policy for one provider: token-bucket rate limit, adaptive
+    # concurrency, and retries with exponential backoff + full jitter that honour
+    # Retry-After. call()/acall() take a zero-argument function that performs one
+    # HTTP attempt and returns a requests or httpx response.
+    def __init__(
+        self,
+        name,
+        rate,
+        burst,
+        concurrency,
+        max_concurrency,
+        max_retries=5,
+        backoff_base=0.5,
+        backoff_max=30.0,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AdaptiveLimiter(concurrency, 1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def backoff(self, attempt, response=None):
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _outcome(self, attempt, response=None, error=None):
+        # Returns (throttled, delay before the next attempt or None when done)
+        throttled = response is not None and response.status_code in THROTTLE_STATUS
+        if throttled:
+            self.stats["throttled"] += 1
+            outbound_throttled.labels(self.name).inc()
+        retryable = error is not None or response.status_code in RETRYABLE_STATUS
+        if not retryable:
+            return throttled, None
+        if attempt >= self.max_retries:
+            self.stats["failures"] += 1
+            outbound_failures.labels(self.name).inc()
+            return throttled, None
+        self.stats["retries"] += 1
+        outbound_retries.labels(self.name).inc()
+        return throttled, self.backoff(attempt, response)
+
+    def call(self, fn):
+        self.stats["calls"] += 1
+        outbound_calls.labels(self.name).inc()
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.bucket.reserve())
+            self.limiter.acquire()
+            response = error = None
+            try:
+                response = fn()
+            except retryable_errors() as e:
+                error = e
+            except BaseException:
+                self.limiter.release()
+                raise
+            throttled, delay = self._outcome(attempt, response, error)
+            self.limiter.release(throttled)
+            if delay is None:
+                break
+            time.sleep(delay)
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        return response
+
+    async def acall(self, fn):
+        self.stats["calls"] += 1
+        outbound_calls.labels(self.name).inc()
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.bucket.reserve())
+            await self.limiter.acquire_async()
+            response = error = None
+            try:
+                response = await fn()
+            except retryable_errors() as e:
+                error = e
+            except BaseException:
+                self.limiter.release()
+                raise
+            throttled, delay = self._outcome(attempt, response, error)
+            self.limiter.release(throttled)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        response.raise_for_status()
+        return response
+
+
+def _env(name, default):
+    return float(os.environ.get(name, default))
+
+
+governors = {
+    "gemini": Governor(
+        "gemini",
+        rate=_env("GEMINI_RATE", "10"),
+        burst=_env("GEMINI_BURST", "20"),
+        concurrency=_env("GEMINI_INITIAL_CONCURRENCY", "8"),
+        max_concurrency=int(_env("GEMINI_MAX_CONCURRENCY", "32")),
+        max_retries=int(_env("GEMINI_MAX_RETRIES", "5")),
+    ),
+    "pexels": Governor(
+        "pexels",
+        rate=_env("PEXELS_RATE", "1"),
+        burst=_env("PEXELS_BURST", "10"),
+        concurrency=_env("PEXELS_INITIAL_CONCURRENCY", "4"),
+        max_concurrency=int(_env("PEXELS_MAX_CONCURRENCY", "16")),
+        max_retries=int(_env("PEXELS_MAX_RETRIES", "5")),
+    ),
+}
+
+
+def get_governor(name):
+    return governors[name]
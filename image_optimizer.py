@@ -0,0 +1,71 @@
+import os
+
+from io import BytesIO
+
+
+IMAGE_OPTIMIZE = os.environ.get("IMAGE_OPTIMIZE", "1") == "1"
+# Largest image any renderer draws: a full 10in slide at ~160 dpi
+IMAGE_MAX_WIDTH = int(os.environ.get("IMAGE_MAX_WIDTH", "1600"))
+IMAGE_MAX_HEIGHT = int(os.environ.get("IMAGE_MAX_HEIGHT", "1200"))
+# Logos are drawn 1-1.5in wide
+LOGO_MAX_WIDTH = int(os.environ.get("LOGO_MAX_WIDTH", "512"))
+LOGO_MAX_HEIGHT = int(os.environ.get("LOGO_MAX_HEIGHT", "512"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "82"))
+
+IMAGE_BOUNDS = (IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT)
+LOGO_BOUNDS = (LOGO_MAX_WIDTH, LOGO_MAX_HEIGHT)
+
+# Formats python-pptx can embed; anything else is always converted
+EMBEDDABLE_FORMATS = ("JPEG", "PNG", "GIF", "BMP", "TIFF")
+
+
+def fit(width, height, max_width=None, max_height=None):
+    # Size of a width x height image scaled down to fit the box (never up)
+    scale = 1.0
+    if max_width:
+        scale = min(scale, max_width / width)
+    if max_height:
+        scale = min(scale, max_height / height)
+    return round(width * scale), round(height * scale)
+
+
+def _has_transparency(image):
+    if image.mode == "P":
+        return "transparency" in image.info
+    if image.mode in ("RGBA", "LA", "PA"):
+        return image.getchannel("A").getextrema()[0] < 255
+    return False
+
+
+def optimize_image(content, max_width, max_height, quality=IMAGE_JPEG_QUALITY):
+    # Downsamples to fit max_width x max_height and recompresses: JPEG for
+    # opaque images, optimized PNG when transparency is used (logos). Returns
+    # the original bytes if they can't be decoded or are already smaller.
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(BytesIO(content))
+        if getattr(image, "is_animated", False):
+            return content
+        source_format = image.format
+        # JPEGs decode straight at a reduced scale when much larger than needed
+        image.draft("RGB", (max_width, max_height))
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        return content
+
+    transparent = _has_transparency(image)
+    image.thumbnail((max_width, max_height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if transparent:
+        image.convert("RGBA").save(buffer, "PNG", optimize=True)
+    else:
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=quality, optimize=True, progressive=True
+        )
+    optimized = buffer.getvalue()
+
+    if source_format in EMBEDDABLE_FORMATS and len(optimized) >= len(content):
+        return content
+    return optimized
@@ -1,8 +1,68 @@
-import requests
 import os
 
+from functools import cache
+from pathlib import Path
+
+from cache import DiskCache, LRUCache, TieredCache, make_key
+from governor import get_governor
+from image_optimizer import IMAGE_BOUNDS, fit
+
+
+PEXELS_API_BASE = os.environ.get("PEXELS_API_BASE", "https://api.pexels.com/v1")
+PEXELS_CACHE_TTL = float(os.environ.get("PEXELS_CACHE_TTL", "604800"))
+PEXELS_CACHE_DIR = os.environ.get(
+    "PEXELS_CACHE_DIR", str(Path(__file__).parent / ".cache" / "pexels")
+)
+
+# query -> image URL, so repeated hero image queries skip the Pexels search
+pexels_cache = TieredCache(
+    LRUCache(1024, ttl=PEXELS_CACHE_TTL),
+    DiskCache(PEXELS_CACHE_DIR, ttl=PEXELS_CACHE_TTL) if PEXELS_CACHE_DIR else None,
+    name="pexels",
+)
+pexels_governor = get_governor("pexels")
+
+
+@cache
+def get_session():
+    # Created on first use, so requests is not imported with this module
+    import requests
+
+    return requests.Session()
+
+
+# Pexels src variants, smallest first, with the box the CDN scales the
+# original into (None = unconstrained)
+PEXELS_VARIANTS = (
+    ("small", None, 130),
+    ("medium", None, 350),
+    ("large", 940, 650),
+    ("large2x", 1880, 1300),
+)
+
+
+def choose_pexels_src(photo, bounds=IMAGE_BOUNDS):
+    # Smallest variant that still covers the image at slide resolution, so the
+    # download is never upscaled later and never much bigger than needed
+    src = photo["src"]
+    width, height = photo.get("width"), photo.get("height")
+    if not width or not height:
+        return src.get("large2x") or src["original"]
+    needed_width, _ = fit(width, height, *bounds)
+    for name, max_width, max_height in PEXELS_VARIANTS:
+        if name in src and fit(width, height, max_width, max_height)[0] >= needed_width:
+            return src[name]
+    return src["original"]
+
 
 def get_image_from_pexels(prompt):
+    cache_key = make_key(
+        "pexels", " ".join(str(prompt).lower().split()), list(IMAGE_BOUNDS)
+    )
+    image_url = pexels_cache.get(cache_key)
+    if image_url is not None:
+        return image_url
+
     pexels_api_key = os.environ.get("PEXELS_API_KEY")
 
     headers = {
@@ -11,11 +71,14 @@ def get_image_from_pexels(prompt):
     }
 
     params = {"query": prompt, "per_page": 1}
-    url = "https://api.pexels.com/v1/search"
-    response = requests.get(url, headers=headers, params=params)
+    url = f"{PEXELS_API_BASE}/search"
+    response = pexels_governor.call(
+        lambda: get_session().get(url, headers=headers, params=params, timeout=15)
+    )
     data = response.json()
+    image_url = ""
     if data["total_results"] > 0:
         photo = data["photos"][0]
-        image_url = photo["src"]["original"]
-        return image_url
-    return ""
+        image_url = choose_pexels_src(photo)
+    pexels_cache.set(cache_key, image_url)
+    return image_url
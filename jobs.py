@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from pathlib import Path
+
+from files import write_atomic
+from metrics import job_queue_depth
+
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+JOB_TTL = float(os.environ.get("JOB_TTL", "3600"))
+# Job state is mirrored to disk so any uvicorn worker process can answer
+# status and event requests for a job that runs in another worker
+JOB_STATE_DIR = Path(
+    os.environ.get("JOB_STATE_DIR", str(Path(__file__).parent / ".cache" / "jobs"))
+)
+
+FINISHED = ("done", "failed")
+
+
+class Job:
+    def __init__(self, input, id=None, handler=None):
+        self.id = id or str(uuid.uuid4())
+        self.input = input
+        self.handler = handler
+        self.status = "queued"
+        self.stage = None
+        self.stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._subscribers = []
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(None, id=data["id"])
+        for key in ("status", "stage", "stages", "result", "error"):
+            setattr(job, key, data[key])
+        job.created_at = data["created_at"]
+        job.updated_at = data["updated_at"]
+        return job
+
+
+class JobQueue:
+    def __init__(self, handler, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE):
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self.jobs = {}
+        self._queue = None
+        self._tasks = []
+
+    async def start(self):
+        JOB_STATE_DIR.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def submit(self, input, handler=None):
+        self._prune()
+        job = Job(input, handler=handler)
+        self._queue.put_nowait(job)  # raises asyncio.QueueFull when saturated
+        job_queue_depth.set(self.depth())
+        self.jobs[job.id] = job
+        self._save(job)
+        return job
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            uuid.UUID(job_id)
+            return Job.from_dict(json.loads(self._path(job_id).read_text()))
+        except (OSError, ValueError):
+            return None
+
+    async def events(self, job_id, poll_interval=0.5):
+        job = self.jobs.get(job_id)
+        if job is None:
+            # Running in another worker process: follow its state file
+            last = None
+            while True:
+                job = self.get(job_id)
+                if job is None:
+                    return
+                if job.updated_at != last:
+                    last = job.updated_at
+                    yield job.to_dict()
+                if job.status in FINISHED:
+                    return
+                await asyncio.sleep(poll_interval)
+
+        queue = asyncio.Queue()
+        job._subscribers.append(queue)
+        try:
+            event = job.to_dict()
+            yield event
+            # Drain the queue up to the final event, however far behind this
+            # subscriber is: job.status may already be finished meanwhile
+            while event["status"] not in FINISHED:
+                event = await queue.get()
+                yield event
+        finally:
+            job._subscribers.remove(queue)
+
+    def _update(self, job, **changes):
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.updated_at = time.time()
+        self._save(job)
+        event = job.to_dict()
+        for queue in job._subscribers:
+            queue.put_nowait(event)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job_queue_depth.set(self.depth())
+
+            async def progress(stage, job=job):
+                job.stages.append({"stage": stage, "started_at": time.time()})
+                self._update(job, status="running", stage=stage)
+
+            self._update(job, status="running")
+            try:
+                handler = job.handler or self.handler
+                result = await handler(job.input, progress=progress)
+                self._update(job, status="done", stage=None, result=result)
+            except Exception as e:
+                self._update(job, status="failed", error=repr(e))
+            finally:
+                self._queue.task_done()
+
+    def _path(self, job_id):
+        return JOB_STATE_DIR / f"{job_id}.json"
+
+    def _save(self, job):
+        write_atomic(self._path(job.id), json.dumps(job.to_dict(), default=str))
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.status in FINISHED and now - job.updated_at > JOB_TTL:
+                del self.jobs[job_id]
+                self._path(job_id).unlink(missing_ok=True)
@@ -0,0 +1,97 @@
+import json
+
+
+class DeckStreamParser:
+    # Incremental parser for the master prompt response. Feed it text chunks as
+    # they stream in; it returns each element of the top-level "list" array as
+    # soon as that element's closing brace arrives. Anything before the root
+    # object (such as a ```json fence) is ignored, and so is an element that
+    # isn't valid JSON.
+    def __init__(self, list_key="list"):
+        self.list_key = list_key
+        self.header = {}
+        self.buffer = ""
+        self.emitted = 0
+        self._pos = 0
+        self._root_start = None
+        self._root_end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._key = None
+        self._list_depth = None
+        self._list_start = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        items = []
+        buffer = self.buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+
+            if self._root_end is not None:
+                break
+            if self._root_start is None:
+                if char == "{":
+                    self._root_start = i
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buffer[self._string_start : i + 1]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char == ":" and self._depth == 1:
+                self._key = json.loads(self._last_string)
+            elif char in "{[":
+                if self._depth == self._list_depth and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+                if (
+                    char == "["
+                    and self._depth == 2
+                    and self._key == self.list_key
+                    and self._list_depth is None
+                ):
+                    self._list_depth = 2
+                    self._list_start = i
+                    self._parse_header(buffer[self._root_start : i])
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == self._list_depth and self._item_start is not None:
+                    try:
+                        items.append(json.loads(buffer[self._item_start : i + 1]))
+                    except ValueError:
+                        # Not streamed: the repair pass over the whole response
+                        # fixes or regenerates it
+                        pass
+                    self._item_start = None
+                elif self._depth == 1 and self._list_depth is not None:
+                    self._list_depth = None
+                elif self._depth == 0:
+                    self._root_end = i
+        self._pos = len(buffer)
+        self.emitted += len(items)
+        return items
+
+    def _parse_header(self, text):
+        # Keys that precede "list" (logoURL, color) are complete at this point
+        text = text[: text.rstrip().rfind('"' + self.list_key + '"')]
+        text = text.rstrip().rstrip(",") + "}"
+        try:
+            self.header = json.loads(text)
+        except ValueError:
+            self.header = {}
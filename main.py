@@ -1,34 +1,146 @@
-import uvicorn
+import asyncio
+import base64
+import copy
 import os
+import time
 import uuid
 import json
 
-from datetime import datetime
-from fastapi import FastAPI, Request
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from io import BytesIO
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import (
     HTMLResponse,
     JSONResponse,
     FileResponse,
+    RedirectResponse,
+    Response,
     StreamingResponse,
 )
 
-from pptx_generator_v2 import create_pptx_from_json
+from renderer import (
+    DECK_RENDERER,
+    RENDERER_MODULES,
+    StreamingDeck,
+    create_pptx,
+    get_renderer,
+    render_timings,
+)
 
-from supabase import create_client, Client
 from pathlib import Path
 from dotenv import load_dotenv
 
 from img import get_image_from_pexels
 
-from ai import gemini
+from ai import gemini_async, gemini_stream, close_async_client
+
+from jsonstream import DeckStreamParser
+
+from deck_models import (
+    DECK_RESPONSE_SCHEMA,
+    SLIDE_RESPONSE_SCHEMAS,
+    DeckError,
+    loads_lenient,
+    parse_deck,
+    parse_slide,
+    repair_slide,
+    slide_adapter,
+)
+
+from pptx_patch import PatchError, patch_item
+
+from jobs import JobQueue
+
+from batch import (
+    BATCH_CONCURRENCY,
+    BATCH_DIR,
+    open_batch_zip,
+    parse_leads,
+    run_batch,
+    write_manifest,
+)
+
+from pptx_templates import templates
+
+from prompts import prompts, get_prompt
+
+
+from deck_cache import deck_files, deck_meta
+
+from cache import LRUCache
+
+from assets import prefetch_assets
+
+from dedup import DECK_DEDUP_WINDOW, find_recent_deck, input_fingerprint
+
+from storage import deck_store
+
+from pipeline import Pipeline
+
+from metrics import (
+    count_validation,
+    mark_process_dead,
+    observe_materialization,
+    observe_pipeline,
+    observe_slide_render,
+    render_metrics,
+    track_generation,
+)
 
 app = FastAPI()
 
 _ = load_dotenv(Path(__file__).parent / ".env")
 
-supabase_url: str = os.environ.get("SUPABASE_URL")
-supabase_key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+DECK_STREAMING = os.environ.get("DECK_STREAMING", "0") == "1"
+# Search the hero image from the raw input while the master prompt runs,
+# falling back to the generated deck when that finds nothing
+DECK_SPECULATIVE_IMAGE = os.environ.get("DECK_SPECULATIVE_IMAGE", "1") == "1"
+# Store only the deck JSON when generating; the PPTX is rendered on its first
+# download, or ahead of it when the deck is prewarmed
+DECK_LAZY_PPTX = os.environ.get("DECK_LAZY_PPTX", "0") == "1"
+# Rendered decks live in memory and go straight to storage unless this is set
+SAVE_DECKS_LOCALLY = os.environ.get("SAVE_DECKS_LOCALLY", "0") == "1"
+# "serve" relays bytes through the local deck cache, "redirect" hands out signed URLs
+PPTX_DOWNLOAD_MODE = os.environ.get("PPTX_DOWNLOAD_MODE", "serve")
+PPTX_SIGNED_URL_TTL = int(os.environ.get("PPTX_SIGNED_URL_TTL", "600"))
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", "50"))
+ADMIN_MAX_PAGE_SIZE = int(os.environ.get("ADMIN_MAX_PAGE_SIZE", "500"))
+ADMIN_SUMMARY_TTL = float(os.environ.get("ADMIN_SUMMARY_TTL", "60"))
+# Serverless: skip parsing every template at startup, so a cold instance only
+# pays for what its first request uses
+DECK_FAST_START = os.environ.get("DECK_FAST_START", "0") == "1"
+
+admin_summary_cache = LRUCache(1, ttl=ADMIN_SUMMARY_TTL)
+render_timings.hooks.append(observe_slide_render)
+# input_hash -> task generating that deck in this process, so a double-click
+# joins the first request instead of starting a second generation
+pending_decks = {}
+# uuid -> task rendering a lazy deck, shared by every request waiting for it
+materializing_decks = {}
+
+
+@app.exception_handler(DeckError)
+async def deck_error_handler(request: Request, exc: DeckError):
+    # The LLM returned an unusable deck twice in a row
+    return JSONResponse({"detail": f"Deck generation failed: {exc}"}, status_code=502)
+
+
+@app.on_event("startup")
+async def startup():
+    if not DECK_FAST_START:
+        await run_in_threadpool(templates.preload)
+        await run_in_threadpool(prompts.load_all)
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await deck_store.close()
+    await close_async_client()
+    mark_process_dead()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -37,6 +149,10 @@ async def read_index():
     placeholder = """COMPANY: Acme Inc.
 PRODUCT: Firefighter Suit
 LEAD: John Smith"""
+    renderer_options = "".join(
+        f'<option value="{name}"{" selected" if name == DECK_RENDERER else ""}>{name}</option>'
+        for name in RENDERER_MODULES
+    )
 
     return HTMLResponse(
         f"""
@@ -46,6 +162,9 @@ LEAD: John Smith"""
     <form action="/generate-deck" method="post">
         <label for="lead">Data: (you can put here whatever you want in any format)</label><br>
         <textarea id="data" name="data" rows="10" cols="100">{placeholder}</textarea><br>
+        <label for="renderer">Renderer:</label>
+        <select id="renderer" name="renderer">{renderer_options}</select><br>
+        <label><input type="checkbox" name="force" value="1"> Regenerate even if this input was already used</label><br>
         <input type="submit" value="Generate Deck" onclick="this.form.submit(); this.disabled=true;">
     </form>
     </body>
@@ -54,15 +173,41 @@ LEAD: John Smith"""
     )
 
 
-@app.post("/generate-deck", response_class=HTMLResponse)
-async def generate_deck_form(request: Request):
+async def read_deck_input(request: Request):
     form_data = await request.form()
     data = form_data.get("data")
     try:
         data = json.loads(data)
     except Exception as _:
         data = data
-    deck_uuid, deck_content = generate_deck(data)
+    return data
+
+
+async def read_renderer(request: Request):
+    # Optional "renderer" form field; unknown names are rejected up front
+    form_data = await request.form()
+    name = form_data.get("renderer") or None
+    if name is None:
+        return None
+    try:
+        return get_renderer(name).name
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown renderer: {name}")
+
+
+async def read_force(request: Request):
+    # "force" (form field or query parameter) skips deduplication
+    form_data = await request.form()
+    value = form_data.get("force") or request.query_params.get("force") or ""
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+@app.post("/generate-deck", response_class=HTMLResponse)
+async def generate_deck_form(request: Request):
+    data = await read_deck_input(request)
+    renderer = await read_renderer(request)
+    force = await read_force(request)
+    deck_uuid, deck_content = await generate_deck(data, renderer=renderer, force=force)
     deck_content_html = json.dumps(deck_content, indent=4)
     return HTMLResponse(
         '<a href="/">← Back</a><br><br>'
@@ -77,79 +222,828 @@ async def generate_deck_form(request: Request):
     )
 
 
+def encode_cursor(deck):
+    raw = json.dumps([deck["created_at"], deck["uuid"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    # Raises ValueError for anything encode_cursor() didn't produce
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    value = json.loads(raw)
+    if (
+        not isinstance(value, list)
+        or len(value) != 2
+        or not all(isinstance(item, str) for item in value)
+    ):
+        raise ValueError("cursor is not a [created_at, uuid] pair")
+    created_at, deck_uuid = value
+    return created_at, deck_uuid
+
+
+async def fetch_decks_page(cursor=None, limit=ADMIN_PAGE_SIZE):
+    after = decode_cursor(cursor) if cursor else None
+    decks = await deck_store.list_decks(limit + 1, after)
+    next_cursor = encode_cursor(decks[limit - 1]) if len(decks) > limit else None
+    return decks[:limit], next_cursor
+
+
+async def fetch_decks_summary():
+    summary = admin_summary_cache.get("summary")
+    if summary is None:
+        since = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+        total, last_day, latest = await asyncio.gather(
+            deck_store.count_decks(),
+            deck_store.count_decks(since),
+            deck_store.latest_created_at(),
+        )
+        summary = {
+            "total": total,
+            "last_24h": last_day,
+            "latest_created_at": latest,
+            "computed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        admin_summary_cache.set("summary", summary)
+    return summary
+
+
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_page():
-    decks = (
-        supabase.table("decks2")
-        .select("uuid, created_at")
-        .order("created_at", desc=True)
-        .execute()
+async def admin_page(
+    cursor: str | None = None, limit: int = ADMIN_PAGE_SIZE, format: str = "html"
+):
+    limit = max(1, min(limit, ADMIN_MAX_PAGE_SIZE))
+    try:
+        decks, next_cursor = await fetch_decks_page(cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if format == "json":
+        return JSONResponse({"decks": decks, "next_cursor": next_cursor})
+
+    async def stream():
+        yield '<html><body><a href="/">← Back</a><br><br><h1>Admin Page: All Decks</h1>'
+        yield '<p><a href="/admin/summary">Summary</a></p><ul>'
+        for deck in decks:
+            yield f'<li>[{datetime.fromisoformat(deck["created_at"]).strftime("%Y-%m-%d %H:%M")}] <a href="/pptx/{deck["uuid"]}.pptx">PPTX</a></li>'
+        yield "</ul>"
+        if next_cursor:
+            yield f'<a href="/admin?cursor={next_cursor}&limit={limit}">Older decks →</a><br><br>'
+        yield '<a href="/">← Back</a></body></html>'
+
+    return StreamingResponse(stream(), media_type="text/html")
+
+
+@app.get("/admin/summary")
+async def admin_summary():
+    return await fetch_decks_summary()
+
+
+@app.get("/metrics")
+async def metrics():
+    content, content_type = await run_in_threadpool(render_metrics)
+    return Response(content, media_type=content_type)
+
+
+@app.get("/admin/pipeline-stats")
+async def admin_pipeline_stats():
+    # Stage spans and critical path of recent deck generations in this worker
+    return {
+        pipeline.name: list(pipeline.recent)
+        for pipeline in (*deck_pipelines, edit_pipeline)
+    }
+
+
+@app.get("/admin/render-stats")
+async def admin_render_stats():
+    # Slide render time per renderer and slide type since this worker started
+    return {"default": DECK_RENDERER, "slides": render_timings.snapshot()}
+
+
+async def no_progress(stage):
+    pass
+
+
+def choose_renderer(renderer, deck_content):
+    # Request choice first, then a renderer pinned by the deck, then the default
+    return get_renderer(renderer or deck_content.get("renderer")).name
+
+
+# Deck generation as a DAG of stages (see pipeline.py). Both pipelines share
+# every stage after the master prompt; the streaming one renders slides while
+# the master prompt is still streaming in.
+deck_pipeline = Pipeline("deck")
+streaming_deck_pipeline = Pipeline("deck_streaming")
+# DECK_LAZY_PPTX: stops once the deck JSON, with its hero image, is stored
+lazy_deck_pipeline = Pipeline("deck_lazy")
+deck_pipelines = (deck_pipeline, streaming_deck_pipeline, lazy_deck_pipeline)
+
+
+def deck_stage(name, after=(), undo=None, lazy=True):
+    # lazy=False: only on the pipelines that render the PPTX
+    def register(fn):
+        for pipeline in deck_pipelines:
+            if lazy or pipeline is not lazy_deck_pipeline:
+                pipeline.stage(name, after, undo)(fn)
+        return fn
+
+    return register
+
+
+async def validate_deck(response, prompt):
+    # Small schema violations are repaired in place; regenerating the deck is
+    # the last resort, and a second invalid response raises DeckError
+    try:
+        deck_content, repaired = parse_deck(response)
+    except DeckError:
+        count_validation("regenerated")
+        response = await gemini_async(
+            prompt,
+            prefix=get_prompt("master"),
+            response_schema=DECK_RESPONSE_SCHEMA,
+            refresh=True,
+        )
+        try:
+            deck_content, repaired = parse_deck(response)
+        except DeckError:
+            count_validation("failed")
+            raise
+    count_validation("repaired" if repaired else "valid")
+    return deck_content
+
+
+@deck_pipeline.stage("master_prompt")
+@lazy_deck_pipeline.stage("master_prompt")
+async def master_prompt(run):
+    prompt = f"\n\n{run['input']}\n"
+    master_response = await gemini_async(
+        prompt, prefix=get_prompt("master"), response_schema=DECK_RESPONSE_SCHEMA
     )
-    deck_uuids_html = "".join(
-        f'<li>[{datetime.fromisoformat(deck["created_at"]).strftime("%Y-%m-%d %H:%M")}] <a href="/pptx/{deck["uuid"]}.pptx">PPTX</a></li>'
-        for deck in decks.data
+    return await validate_deck(master_response, prompt)
+
+
+def render_items(deck, items):
+    for index, item in enumerate(items):
+        deck.add(index, item)
+
+
+@deck_pipeline.stage("render_slides", after=("master_prompt",))
+async def render_slides(run):
+    # Everything but the HERO slide, while the hero image is still being found.
+    # The deck is set up from the header (logoURL, color), as when streaming,
+    # so the HERO's placeholder imageURL isn't fetched; each other item's
+    # images are fetched as it is added.
+    deck_content = run["master_prompt"]
+    header = {key: value for key, value in deck_content.items() if key != "list"}
+    deck = await run_in_threadpool(
+        StreamingDeck, header, choose_renderer(run["renderer"], deck_content)
     )
-    return HTMLResponse(
-        f'<html><body><a href="/">← Back</a><br><br><h1>Admin Page: All Decks</h1><ul>{deck_uuids_html}</ul><a href="/">← Back</a></body></html>'
+    await run_in_threadpool(render_items, deck, deck_content.get("list", []))
+    return deck
+
+
+@streaming_deck_pipeline.stage("master_prompt")
+async def stream_master_prompt(run):
+    # Hands every deck item to render_slides as soon as it is parsed
+    prompt = f"\n\n{run['input']}\n"
+    parser = DeckStreamParser()
+    streamed = []
+    async for chunk in gemini_stream(
+        prompt, prefix=get_prompt("master"), response_schema=DECK_RESPONSE_SCHEMA
+    ):
+        # A chunk can complete several items (a cached response is a single
+        # chunk), so items are numbered here rather than from parser.emitted
+        for item in parser.feed(chunk):
+            streamed.append(parse_slide(item))
+            run["parsed"].put_nowait((parser.header, len(streamed) - 1, streamed[-1]))
+    deck_content = await validate_deck(parser.buffer, prompt)
+    # False: the validated deck differs from what was streamed (a dropped
+    # slide or a regeneration), so render_slides' work is thrown away
+    run["parsed"].put_nowait(None if streamed == deck_content["list"] else False)
+    return deck_content
+
+
+@streaming_deck_pipeline.stage("render_slides")
+async def stream_slides(run):
+    deck = None
+    while (parsed := await run["parsed"].get()) is not None:
+        if parsed is False:
+            return None
+        header, index, item = parsed
+        if item is None:
+            continue
+        if deck is None:
+            deck = await run_in_threadpool(
+                StreamingDeck, header, choose_renderer(run["renderer"], header)
+            )
+        await run_in_threadpool(deck.add, index, item)
+    return deck
+
+
+@deck_stage("image_prompt", after=() if DECK_SPECULATIVE_IMAGE else ("master_prompt",))
+async def image_prompt(run):
+    # Speculatively described from the raw input, overlapping the master prompt
+    source = run["input"] if DECK_SPECULATIVE_IMAGE else run["master_prompt"]
+    return await gemini_async(f"\n\n{source}\n", prefix=get_prompt("image"))
+
+
+@deck_stage("image_search", after=("image_prompt",))
+async def image_search(run):
+    return await run_in_threadpool(get_image_from_pexels, run["image_prompt"])
+
+
+@deck_stage("hero_image", after=("master_prompt", "image_search"))
+async def hero_image(run):
+    image_url = run["image_search"]
+    if not image_url and DECK_SPECULATIVE_IMAGE:
+        # Nothing found for the speculative query: describe the generated deck
+        image_response = await gemini_async(
+            f"\n\n{run['master_prompt']}\n", prefix=get_prompt("image")
+        )
+        image_url = await run_in_threadpool(get_image_from_pexels, image_response)
+    return image_url
+
+
+@deck_stage("image_download", after=("master_prompt", "hero_image"), lazy=False)
+async def image_download(run):
+    hero = {**run["master_prompt"]["list"][0], "imageURL": run["hero_image"]}
+    return await run_in_threadpool(prefetch_assets, {"list": [hero]})
+
+
+@deck_stage("render", after=("render_slides", "image_download"), lazy=False)
+async def render_pptx(run):
+    deck_content = run["master_prompt"]
+    deck_content["list"][0]["imageURL"] = run["hero_image"]
+    deck = run["render_slides"]
+    if deck is None:
+        # Nothing usable was streamed; finish() renders every slide
+        deck = await run_in_threadpool(
+            StreamingDeck, deck_content, choose_renderer(run["renderer"], deck_content)
+        )
+    deck_content["renderer"] = deck.renderer.name
+    deck.assets.update(run["image_download"])
+    buffer = BytesIO()
+    await run_in_threadpool(deck.finish, deck_content, run["deck_uuid"], output=buffer)
+    return buffer.getvalue()
+
+
+async def remove_pptx(run):
+    await deck_store.remove([f"{run['deck_uuid']}.pptx"])
+
+
+@deck_stage("upload", after=("render",), undo=remove_pptx, lazy=False)
+async def upload_pptx(run):
+    # Save the PPTX to Supabase bucket
+    pptx_filename = f"{run['deck_uuid']}.pptx"
+    if SAVE_DECKS_LOCALLY:
+        await run_in_threadpool(
+            Path(f"decks/{pptx_filename}").write_bytes, run["render"]
+        )
+    await deck_store.upload(pptx_filename, run["render"])
+
+
+async def delete_deck_row(run):
+    await deck_store.delete_deck(run["deck_uuid"])
+
+
+def deck_row(run, **fields):
+    row = {
+        "json_content": run["master_prompt"],
+        "input": run["input"],
+        "uuid": run["deck_uuid"],
+        **fields,
+    }
+    # Optional columns are only written when the feature that needs their
+    # migration is on, so older tables keep accepting inserts
+    if DECK_DEDUP_WINDOW > 0:
+        row["input_hash"] = run["input_hash"]
+    return row
+
+
+# The row is written while the file uploads; if either fails both are undone
+@deck_stage("insert", after=("render",), undo=delete_deck_row, lazy=False)
+async def insert_deck(run):
+    render_seconds = run.durations()["render"]
+    pptx_bytes = len(run["render"])
+    fields = {"pptx_filename": f"{run['deck_uuid']}.pptx"}
+    if DECK_LAZY_PPTX:  # migrations/004_decks2_lazy_pptx.sql
+        fields.update(pptx_bytes=pptx_bytes, render_seconds=round(render_seconds, 3))
+    await deck_store.insert_deck(deck_row(run, **fields))
+    observe_materialization("generate", render_seconds, pptx_bytes)
+
+
+@lazy_deck_pipeline.stage("insert", after=("hero_image",), undo=delete_deck_row)
+async def insert_lazy_deck(run):
+    # No pptx_filename until materialize_deck has rendered and stored the file
+    deck_content = run["master_prompt"]
+    deck_content["list"][0]["imageURL"] = run["hero_image"]
+    deck_content["renderer"] = choose_renderer(run["renderer"], deck_content)
+    await deck_store.insert_deck(deck_row(run, pptx_filename=None))
+
+
+for pipeline in deck_pipelines:
+    pipeline.hooks.append(observe_pipeline)
+
+
+async def generate_deck(
+    input: dict,
+    progress=no_progress,
+    stream=DECK_STREAMING,
+    renderer=None,
+    force=False,
+    lazy=DECK_LAZY_PPTX,
+):
+    deck_uuid, deck_content, _ = await create_deck(
+        input, progress, stream, renderer, force, lazy
+    )
+    return deck_uuid, deck_content
+
+
+def deck_input_hash(input, renderer=None):
+    return input_fingerprint(
+        input,
+        renderer or DECK_RENDERER,
+        get_prompt("master").version,
+        get_prompt("image").version,
+        DECK_SPECULATIVE_IMAGE,
+    )
+
+
+async def find_stored_deck(input_hash):
+    existing = await find_recent_deck(deck_store, input_hash)
+    if existing is None:
+        return None
+    if existing["pptx_filename"]:
+        deck_meta.set(existing["uuid"], existing["pptx_filename"])
+    else:
+        # A lazy deck asked for again is likely to be downloaded this time
+        prewarm_deck(existing["uuid"])
+    return existing["uuid"], existing["json_content"], None
+
+
+async def create_deck(
+    input,
+    progress=no_progress,
+    stream=DECK_STREAMING,
+    renderer=None,
+    force=False,
+    lazy=DECK_LAZY_PPTX,
+):
+    # Returns (uuid, content, pptx bytes); the bytes are None when an existing
+    # deck was returned instead of generating a new one, or for a lazy deck
+    input_hash = deck_input_hash(input, renderer)
+    dedup = not force and DECK_DEDUP_WINDOW > 0
+    pending = pending_decks.get(input_hash)
+    if dedup and pending is not None:
+        # Same input already being generated in this process: join it
+        deck_uuid, deck_content, _ = await asyncio.shield(pending)
+        await progress("deduplicated")
+        return deck_uuid, deck_content, None
+
+    # Registered before the storage lookup so concurrent duplicates join it
+    task = asyncio.ensure_future(
+        reuse_or_build_deck(input, input_hash, progress, stream, renderer, dedup, lazy)
     )
+    pending_decks[input_hash] = task
+    try:
+        return await task
+    finally:
+        if pending_decks.get(input_hash) is task:
+            del pending_decks[input_hash]
 
 
-def generate_deck(input: dict):
-    master = Path("prompts/master.txt").read_text() + f"\n\n{input}\n"
-    master_response = gemini(master)
-    master_response = master_response.replace("```json", "").replace("```", "")
-    deck_content = json.loads(master_response)
+async def reuse_or_build_deck(
+    input, input_hash, progress, stream, renderer, dedup, lazy
+):
+    if dedup:
+        existing = await find_stored_deck(input_hash)
+        if existing is not None:
+            await progress("deduplicated")
+            return existing
 
-    image = Path("prompts/image.txt").read_text() + f"\n\n{deck_content}\n"
-    image_response = gemini(image)
-    image_url = get_image_from_pexels(image_response)
-    deck_content["list"][0]["imageURL"] = image_url
+    with track_generation():
+        return await build_deck(input, input_hash, progress, stream, renderer, lazy)
 
-    # pptx = Path("prompts/pptx.txt").read_text() + f"\n\n{deck_content}\n"
-    # pptx_response = gemini(pptx)
+
+async def build_deck(input, input_hash, progress, stream, renderer, lazy=False):
     deck_uuid = str(uuid.uuid4())
-    pptx_filename = create_pptx_from_json(deck_content, deck_uuid)
-    # download_filename = f"deck-{uuid}.pptx"
+    if lazy:
+        pipeline = lazy_deck_pipeline
+    else:
+        pipeline = streaming_deck_pipeline if stream else deck_pipeline
+    run = await pipeline.run(
+        progress,
+        id=deck_uuid,
+        input=input,
+        input_hash=input_hash,
+        deck_uuid=deck_uuid,
+        renderer=renderer,
+        parsed=asyncio.Queue(),
+    )
+    pptx_content = run.results.get("render")
+    if pptx_content is not None:
+        deck_meta.set(deck_uuid, f"{deck_uuid}.pptx")
+    return deck_uuid, run["master_prompt"], pptx_content
 
-    # Save the PPTX to Supabase bucket
-    with open(pptx_filename, "rb") as file:
-        pptx_content = file.read()
 
-    pptx_filename = pptx_filename.split("/")[-1]
-    supabase.storage.from_("decks2").upload(pptx_filename, pptx_content)
+async def run_deck_job(input, progress, renderer=None, force=False):
+    deck_uuid, _ = await generate_deck(
+        input, progress=progress, renderer=renderer, force=force
+    )
+    if DECK_LAZY_PPTX:
+        # Job results are download links, so render while the client polls
+        prewarm_deck(deck_uuid)
+    return {"uuid": deck_uuid, "pptx_url": f"/pptx/{deck_uuid}.pptx"}
+
+
+job_queue = JobQueue(run_deck_job)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    data = await read_deck_input(request)
+    renderer = await read_renderer(request)
+    force = await read_force(request)
+    try:
+        job = job_queue.submit(
+            data, handler=partial(run_deck_job, renderer=renderer, force=force)
+        )
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+    }
+
+
+async def create_batch_deck(row, renderer=None, force=False):
+    # Always rendered right away: the zip needs every file
+    deck_uuid, deck_content, pptx_content = await create_deck(
+        row, renderer=renderer, force=force, lazy=False
+    )
+    if pptx_content is None:
+        # Deduplicated: the zip gets the stored file
+        pptx_filename = await lookup_pptx_filename(deck_uuid, "batch")
+        path = await fetch_deck_file(pptx_filename)
+        pptx_content = await run_in_threadpool(path.read_bytes)
+    return deck_uuid, deck_content, pptx_content
+
+
+async def run_batch_job(batch, progress):
+    with open_batch_zip(batch["id"]) as archive:
+        results, summary = await run_batch(
+            batch["rows"],
+            partial(
+                create_batch_deck, renderer=batch["renderer"], force=batch["force"]
+            ),
+            archive,
+            batch["concurrency"],
+            progress=progress,
+        )
+        manifest = await run_in_threadpool(write_manifest, archive, results, summary)
+    return {"zip_url": f"/batch/{batch['id']}.zip", **manifest}
+
+
+@app.post("/batch", status_code=202)
+async def submit_batch(request: Request):
+    # Multipart form: "leads" file (CSV or JSONL), optional "concurrency",
+    # "renderer" and "force"
+    form_data = await request.form()
+    leads = form_data.get("leads")
+    if leads is None or isinstance(leads, str):
+        raise HTTPException(
+            status_code=400, detail="Upload a CSV or JSONL 'leads' file"
+        )
+    try:
+        rows = parse_leads(leads.filename or "", await leads.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse leads: {e}")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No lead records found")
+    try:
+        concurrency = int(form_data.get("concurrency") or BATCH_CONCURRENCY)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="concurrency must be an integer")
+    renderer = await read_renderer(request)
+    force = await read_force(request)
+
+    batch = {
+        "rows": rows,
+        "concurrency": concurrency,
+        "renderer": renderer,
+        "force": force,
+    }
+    try:
+        job = job_queue.submit(batch, handler=run_batch_job)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full")
+    batch["id"] = job.id
+    return {
+        "id": job.id,
+        "rows": len(rows),
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "zip_url": f"/batch/{job.id}.zip",
+    }
+
+
+@app.get("/batch/{batch_id}.zip")
+async def batch_zip(batch_id: str):
+    job = job_queue.get(batch_id)
+    path = BATCH_DIR / f"{batch_id}.zip"
+    if job is None or job.status != "done" or not path.exists():
+        raise HTTPException(status_code=404, detail="Batch not found or not finished")
+    return FileResponse(
+        path, media_type="application/zip", filename=f"decks-{batch_id}.zip"
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in job_queue.events(job_id):
+            yield f"event: {event['status']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def fetch_deck_row(deck_uuid, *columns):
+    # Slide edits need the version columns (migrations/003); other callers ask
+    # for what they use, so they work on tables without them
+    columns = columns or ("uuid", "input", "json_content", "pptx_filename", "version")
+    return await deck_store.get_deck(deck_uuid, *columns)
+
+
+async def regenerate_slide(parent, index, instructions=None):
+    # One LLM call for one slide; its type and image URLs are kept, so
+    # nothing else is re-fetched
+    deck_content = parent["json_content"]
+    item = deck_content["list"][index]
+    response = await gemini_async(
+        f"\n\nINPUT:\n{parent['input']}\n\n"
+        f"DECK:\n{json.dumps(deck_content, ensure_ascii=False)}\n\n"
+        f"SLIDE INDEX: {index}\n\n"
+        f"INSTRUCTIONS: {instructions or 'Write a fresh alternative.'}\n",
+        prefix=get_prompt("slide"),
+        response_schema=SLIDE_RESPONSE_SCHEMAS[item["type"]],
+        refresh=True,
+    )
+    slide = repair_slide({**loads_lenient(response), "type": item["type"]})
+    if slide is None:
+        raise DeckError(f"Unusable slide in response: {response[:200]}")
+    slide.update((key, value) for key, value in item.items() if key.endswith("URL"))
+    return slide
 
-    supabase.table("decks2").insert(
+
+# Editing one slide of a stored deck: the slide is re-rendered on its own and
+# patched into the existing package (pptx_patch.py), the other slides and
+# their media are copied as they are
+edit_pipeline = Pipeline("deck_edit")
+
+
+@edit_pipeline.stage("edit")
+async def edit_slide_content(run):
+    parent = run["parent"]
+    slide = run["slide"]
+    if slide is None:
+        slide = await regenerate_slide(parent, run["index"], run["instructions"])
+    deck_content = copy.deepcopy(parent["json_content"])
+    deck_content["list"][run["index"]] = slide
+    deck_content["renderer"] = choose_renderer(None, deck_content)
+    return deck_content
+
+
+@edit_pipeline.stage("download")
+async def download_parent(run):
+    parent = run["parent"]
+    pptx_filename = parent["pptx_filename"] or await stored_pptx_filename(
+        parent["uuid"], "edit"
+    )
+    path = await fetch_deck_file(pptx_filename)
+    return await run_in_threadpool(path.read_bytes)
+
+
+def patch_deck(pptx_content, deck_content, index):
+    buffer = BytesIO()
+    get_renderer(deck_content["renderer"]).create_item(
+        deck_content, index, output=buffer
+    )
+    try:
+        return patch_item(pptx_content, index, buffer.getvalue())
+    except PatchError as e:
+        print(f"Re-rendering the whole deck instead of patching slide {index}:", e)
+        return None
+
+
+@edit_pipeline.stage("patch", after=("edit", "download"))
+async def patch_slide(run):
+    return await run_in_threadpool(
+        patch_deck, run["download"], run["edit"], run["index"]
+    )
+
+
+@edit_pipeline.stage("render", after=("patch",))
+async def render_edited_deck(run):
+    # Decks rendered before slides were tagged, or where the item now renders
+    # a different number of slides; images come from the asset cache
+    if run["patch"] is not None:
+        return run["patch"]
+    buffer = BytesIO()
+    await run_in_threadpool(create_pptx, run["edit"], output=buffer)
+    return buffer.getvalue()
+
+
+edit_pipeline.stage("upload", after=("render",), undo=remove_pptx)(upload_pptx)
+
+
+def next_version(parent):
+    # The edit's depth in its lineage, not a unique number: versions count the
+    # edits along one path, so two edits of the same deck are both its
+    # version + 1. The uuid identifies a version.
+    return (parent.get("version") or 1) + 1
+
+
+@edit_pipeline.stage("insert", after=("render",), undo=delete_deck_row)
+async def insert_version(run):
+    parent = run["parent"]
+    await deck_store.insert_deck(
         {
-            "json_content": deck_content,
-            "input": input,
-            "uuid": deck_uuid,
-            "pptx_filename": pptx_filename,
+            "json_content": run["edit"],
+            "input": parent["input"],
+            "uuid": run["deck_uuid"],
+            "pptx_filename": f"{run['deck_uuid']}.pptx",
+            "parent_uuid": parent["uuid"],
+            "version": next_version(parent),
         }
-    ).execute()
+    )
 
-    return deck_uuid, deck_content
+
+@app.post("/decks/{deck_uuid}/slides/{index}")
+async def edit_slide(deck_uuid: str, index: int, request: Request):
+    # Form fields: "slide" (JSON object of fields to change in the slide), or
+    # "regenerate=1" with optional "instructions" to have the LLM rewrite it.
+    # The edited deck is stored as a new version with its own uuid.
+    form_data = await request.form()
+    parent = await fetch_deck_row(deck_uuid)
+    if parent is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    items = parent["json_content"].get("list", [])
+    if not 0 <= index < len(items):
+        raise HTTPException(status_code=404, detail="Slide not found")
+
+    slide = None
+    if not form_data.get("regenerate"):
+        try:
+            changes = json.loads(form_data.get("slide") or "")
+            slide = slide_adapter.validate_python({**items[index], **changes})
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid slide: {e}")
+        slide = slide.model_dump()
+
+    new_uuid = str(uuid.uuid4())
+    run = await edit_pipeline.run(
+        id=new_uuid,
+        parent=parent,
+        index=index,
+        slide=slide,
+        instructions=form_data.get("instructions"),
+        deck_uuid=new_uuid,
+    )
+    deck_meta.set(new_uuid, f"{new_uuid}.pptx")
+    return {
+        "uuid": new_uuid,
+        "parent_uuid": deck_uuid,
+        "version": next_version(parent),
+        "pptx_url": f"/pptx/{new_uuid}.pptx",
+        "patched": run["patch"] is not None,
+        "slide": run["edit"]["list"][index],
+    }
+
+
+async def lookup_pptx_filename(uuid, reason="download"):
+    pptx_filename = deck_meta.get(uuid)
+    if pptx_filename is None:
+        row = await deck_store.get_deck(uuid, "pptx_filename")
+        if row is not None:
+            pptx_filename = row["pptx_filename"]
+            if pptx_filename is None:
+                # Lazy deck: rendered on its first download
+                pptx_filename = await stored_pptx_filename(uuid, reason)
+            deck_meta.set(uuid, pptx_filename)
+    return pptx_filename
+
+
+def start_materializing(deck_uuid, reason):
+    # One render per deck at a time in this process; later callers join it
+    task = materializing_decks.get(deck_uuid)
+    if task is None:
+        task = asyncio.ensure_future(materialize_deck(deck_uuid, reason))
+        materializing_decks[deck_uuid] = task
+
+        def forget(task):
+            del materializing_decks[deck_uuid]
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Failed to render deck {deck_uuid}:", task.exception())
+
+        task.add_done_callback(forget)
+    return task
+
+
+async def stored_pptx_filename(deck_uuid, reason="download"):
+    # Shielded: a client hanging up doesn't cancel the render others wait on
+    return await asyncio.shield(start_materializing(deck_uuid, reason))
+
+
+def prewarm_deck(deck_uuid):
+    # Renders a lazy deck in the background, ahead of its first download
+    if deck_meta.get(deck_uuid) is None:
+        start_materializing(deck_uuid, "prewarm")
+
+
+async def materialize_deck(deck_uuid, reason):
+    # Renders a lazy deck from its stored JSON, uploads it and records the
+    # render time and file size on the row. Returns its pptx_filename, None
+    # for an unknown deck.
+    row = await fetch_deck_row(deck_uuid, "uuid", "json_content", "pptx_filename")
+    if row is None or row["pptx_filename"]:
+        return row and row["pptx_filename"]  # e.g. another worker rendered it
+
+    started_at = time.perf_counter()
+    buffer = BytesIO()
+    await run_in_threadpool(create_pptx, row["json_content"], output=buffer)
+    render_seconds = time.perf_counter() - started_at
+    pptx_content = buffer.getvalue()
+    pptx_filename = f"{deck_uuid}.pptx"
+
+    # Into the local deck cache first, so the waiting download is served from it
+    await run_in_threadpool(deck_files.put, pptx_filename, pptx_content)
+    # upsert: another worker may be rendering the same deck right now
+    await deck_store.upload(pptx_filename, pptx_content, upsert=True)
+    await deck_store.update_deck(
+        deck_uuid,
+        {
+            "pptx_filename": pptx_filename,
+            "pptx_bytes": len(pptx_content),
+            "render_seconds": round(render_seconds, 3),
+        },
+    )
+    observe_materialization(reason, render_seconds, len(pptx_content))
+    deck_meta.set(deck_uuid, pptx_filename)
+    return pptx_filename
+
+
+async def fetch_deck_file(pptx_filename):
+    # Local path of a stored deck, downloading it into the deck cache if needed
+    path = deck_files.get(pptx_filename)
+    if path is None:
+        pptx_content = await deck_store.download(pptx_filename)
+        path = await run_in_threadpool(deck_files.put, pptx_filename, pptx_content)
+    return path
 
 
 @app.get("/pptx/{uuid}.pptx")
-async def generate_pptx(uuid: str):
-    data = supabase.table("decks2").select("pptx_filename").eq("uuid", uuid).execute()
-    print(data)
-
-    if data:
-        pptx_filename = data.data[0]["pptx_filename"]
-        pptx_content = supabase.storage.from_("decks2").download(pptx_filename)
-        pptx_filename_local = f"decks/{pptx_filename}"
-        with open(pptx_filename_local, "wb") as file:
-            file.write(pptx_content)
-
-        return FileResponse(
-            pptx_filename_local,
-            media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-            filename=pptx_filename,
-        )
-    else:
-        return {"error": "PPTX file not found"}
+async def generate_pptx(uuid: str, request: Request):
+    pptx_filename = await lookup_pptx_filename(uuid)
+    if not pptx_filename:
+        return JSONResponse({"error": "PPTX file not found"}, status_code=404)
+
+    if PPTX_DOWNLOAD_MODE == "redirect":
+        # Let the client fetch the bytes from storage directly
+        signed_url = await deck_store.signed_url(pptx_filename, PPTX_SIGNED_URL_TTL)
+        return RedirectResponse(signed_url, status_code=307)
+
+    path = await fetch_deck_file(pptx_filename)
+    etag = await run_in_threadpool(deck_files.etag, path)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse streams the file and answers Range / If-Range requests
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        filename=pptx_filename,
+        headers=headers,
+    )
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
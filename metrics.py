@@ -0,0 +1,173 @@
+import os
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+from dotenv import load_dotenv
+
+# prometheus_client picks its value storage when first imported, so
+# PROMETHEUS_MULTIPROC_DIR from .env has to be in the environment before that
+_ = load_dotenv(Path(__file__).parent / ".env")
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# With `uvicorn --workers N` every worker is a separate process. When this is
+# set, each worker writes its samples to files in the directory and /metrics
+# aggregates all of them; empty the directory before starting the server.
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR:
+    Path(PROMETHEUS_MULTIPROC_DIR).mkdir(parents=True, exist_ok=True)
+
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SLIDE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+stage_seconds = Histogram(
+    "deck_stage_seconds",
+    "Time spent in each deck generation stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+critical_path_seconds = Histogram(
+    "deck_critical_path_seconds",
+    "Time spent in each stage when it was on the critical path of a deck generation",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+generation_seconds = Histogram(
+    "deck_generation_seconds",
+    "End-to-end deck generation time",
+    buckets=STAGE_BUCKETS,
+)
+generations = Counter(
+    "deck_generations_total", "Deck generations by outcome", ["status"]
+)
+generation_failures = Counter(
+    "deck_generation_failures_total",
+    "Failed deck generations by the stage that failed",
+    ["stage"],
+)
+generations_in_flight = Gauge(
+    "deck_generations_in_flight",
+    "Deck generations currently running",
+    multiprocess_mode="livesum",
+)
+job_queue_depth = Gauge(
+    "job_queue_depth", "Jobs waiting for a worker", multiprocess_mode="livesum"
+)
+slide_render_seconds = Histogram(
+    "slide_render_seconds",
+    "Time to render one deck item",
+    ["renderer", "type"],
+    buckets=SLIDE_BUCKETS,
+)
+deck_validations = Counter(
+    "deck_validations_total",
+    "Master prompt responses by validation outcome",
+    ["result"],
+)
+materializations = Counter(
+    "deck_materializations_total",
+    "PPTX files rendered and stored, by what asked for them",
+    ["reason"],
+)
+materialize_seconds = Counter(
+    "deck_materialize_seconds_total",
+    "Time spent rendering stored PPTX files",
+    ["reason"],
+)
+materialized_bytes = Counter(
+    "deck_materialized_bytes_total", "Bytes of PPTX written to storage", ["reason"]
+)
+cache_lookups = Counter(
+    "cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+outbound_calls = Counter(
+    "outbound_calls_total", "Calls to external providers", ["provider"]
+)
+outbound_retries = Counter(
+    "outbound_retries_total", "Retried provider requests", ["provider"]
+)
+outbound_throttled = Counter(
+    "outbound_throttled_total",
+    "Provider responses asking us to slow down",
+    ["provider"],
+)
+outbound_failures = Counter(
+    "outbound_failures_total",
+    "Provider calls that exhausted their retries",
+    ["provider"],
+)
+deck_insert_failures = Counter(
+    "deck_insert_failures_total",
+    "Failed inserts of buffered deck rows (they stay buffered and are retried)",
+)
+
+
+def count_cache(cache, result):
+    cache_lookups.labels(cache, result).inc()
+
+
+def count_validation(result):
+    deck_validations.labels(result).inc()
+
+
+def observe_materialization(reason, seconds, size):
+    materializations.labels(reason).inc()
+    materialize_seconds.labels(reason).inc(seconds)
+    materialized_bytes.labels(reason).inc(size)
+
+
+def observe_slide_render(renderer, slide_type, seconds):
+    slide_render_seconds.labels(renderer, str(slide_type)).observe(seconds)
+
+
+def observe_pipeline(run):
+    # Pipeline hook: every stage's own span (stages overlap, so they don't add
+    # up to the total), the stages on the critical path, and what failed
+    durations = run.durations()
+    for stage, seconds in durations.items():
+        stage_seconds.labels(stage).observe(seconds)
+    for stage in run.critical_path():
+        critical_path_seconds.labels(stage).observe(durations[stage])
+    if run.error is not None:
+        generation_failures.labels(run.failed or "cancelled").inc()
+
+
+@contextmanager
+def track_generation():
+    started_at = time.perf_counter()
+    generations_in_flight.inc()
+    try:
+        yield
+        generations.labels("done").inc()
+        generation_seconds.observe(time.perf_counter() - started_at)
+    except BaseException:
+        generations.labels("failed").inc()
+        raise
+    finally:
+        generations_in_flight.dec()
+
+
+def render_metrics():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    # Drops this worker's live gauges from the aggregate on shutdown
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,3 @@
+-- Keyset pagination for /admin orders by (created_at, uuid) descending
+create index if not exists decks2_created_at_uuid_idx
+    on decks2 (created_at desc, uuid desc);
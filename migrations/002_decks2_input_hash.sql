@@ -0,0 +1,4 @@
+-- Input deduplication looks up the newest deck by (input_hash, created_at)
+alter table decks2 add column if not exists input_hash text;
+create index if not exists decks2_input_hash_created_at_idx
+    on decks2 (input_hash, created_at desc);
@@ -0,0 +1,5 @@
+-- Slide edits store a new row per version, pointing at the deck they were made from.
+-- version is the parent's version + 1 (edits along that path), not unique per deck.
+alter table decks2 add column if not exists parent_uuid text;
+alter table decks2 add column if not exists version integer not null default 1;
+create index if not exists decks2_parent_uuid_idx on decks2 (parent_uuid);
@@ -0,0 +1,4 @@
+-- Lazy decks get their pptx_filename on first download; render and storage spend per deck
+alter table decks2 alter column pptx_filename drop not null;
+alter table decks2 add column if not exists pptx_bytes bigint;
+alter table decks2 add column if not exists render_seconds double precision;
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import time
+
+from collections import deque
+
+
+PIPELINE_RECENT_RUNS = int(os.environ.get("PIPELINE_RECENT_RUNS", "50"))
+
+
+class Stage:
+    def __init__(self, name, fn, after=(), undo=None):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.undo = undo
+
+
+class PipelineRun:
+    # State of one pipeline execution. Stage functions read their inputs and
+    # the results of the stages they depend on as run[name].
+    def __init__(self, pipeline, inputs, id=None):
+        self.pipeline = pipeline
+        self.id = id
+        self.inputs = inputs
+        self.results = {}
+        self.spans = {}  # stage -> [start, end] in seconds since the run started
+        self.failed = None
+        self.error = None
+        self._started_at = time.perf_counter()
+
+    def __getitem__(self, name):
+        if name in self.results:
+            return self.results[name]
+        return self.inputs[name]
+
+    def _now(self):
+        return time.perf_counter() - self._started_at
+
+    def durations(self):
+        return {
+            name: end - start
+            for name, (start, end) in self.spans.items()
+            if end is not None
+        }
+
+    def critical_path(self):
+        # The chain of stages that set the total time: start from the stage
+        # that finished last and keep following the dependency that finished
+        # last (the one that actually held the next stage back)
+        finished = {
+            name: end for name, (_, end) in self.spans.items() if end is not None
+        }
+        if not finished:
+            return []
+        path = [max(finished, key=finished.get)]
+        while True:
+            after = [
+                name
+                for name in self.pipeline.stages[path[-1]].after
+                if name in finished
+            ]
+            if not after:
+                return path[::-1]
+            path.append(max(after, key=finished.get))
+
+    def report(self):
+        durations = self.durations()
+        path = self.critical_path()
+        return {
+            "pipeline": self.pipeline.name,
+            "id": self.id,
+            "total": round(self._now(), 6),
+            "critical_path": path,
+            "critical_seconds": round(sum(durations[name] for name in path), 6),
+            "stages": {
+                name: {
+                    "start": round(start, 6),
+                    "seconds": round(durations[name], 6) if end is not None else None,
+                }
+                for name, (start, end) in self.spans.items()
+            },
+            "failed": self.failed,
+        }
+
+
+class Pipeline:
+    # A DAG of async stages. Each stage starts as soon as every stage it runs
+    # after has finished, so independent stages overlap. If a stage fails the
+    # others are cancelled and the undo callbacks of every stage that started
+    # are run (newest first) before the error propagates. Hooks are called
+    # with the finished PipelineRun, failed or not.
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.hooks = []
+        self.recent = deque(maxlen=PIPELINE_RECENT_RUNS)
+
+    def stage(self, name, after=(), undo=None):
+        # Dependencies must already be registered, which keeps the graph acyclic
+        missing = [dep for dep in after if dep not in self.stages]
+        if missing:
+            raise ValueError(f"{self.name}.{name} runs after unknown stages {missing}")
+
+        def register(fn):
+            self.stages[name] = Stage(name, fn, after, undo)
+            return fn
+
+        return register
+
+    async def run(self, progress=None, id=None, **inputs):
+        # id labels the run in reports (e.g. the deck uuid)
+        run = PipelineRun(self, inputs, id)
+        tasks = {}
+
+        async def execute(stage):
+            if stage.after:
+                await asyncio.gather(*(tasks[name] for name in stage.after))
+            run.spans[stage.name] = [run._now(), None]
+            try:
+                if progress is not None:
+                    await progress(stage.name)
+                result = await stage.fn(run)
+            except BaseException as e:
+                # Dependents re-raise the same error; keep the stage it came from
+                if run.error is None and not isinstance(e, asyncio.CancelledError):
+                    run.failed, run.error = stage.name, e
+                raise
+            run.spans[stage.name][1] = run._now()
+            run.results[stage.name] = result
+            return result
+
+        tasks.update(
+            (name, asyncio.ensure_future(execute(stage)))
+            for name, stage in self.stages.items()
+        )
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException as e:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            if run.error is None:
+                run.error = e
+            await self._undo(run)
+            self._finish(run)
+            raise
+        self._finish(run)
+        return run
+
+    async def _undo(self, run):
+        started = sorted(run.spans, key=lambda name: run.spans[name][0], reverse=True)
+        for name in started:
+            undo = self.stages[name].undo
+            if undo is None:
+                continue
+            try:
+                await undo(run)
+            except Exception as e:
+                print(f"Failed to undo {self.name}.{name}:", e)
+
+    def _finish(self, run):
+        self.recent.append(run.report())
+        for hook in self.hooks:
+            hook(run)
@@ -1,13 +1,14 @@
-from pptx import Presentation
 from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
-import requests
 from io import BytesIO
 
+from renderer import register_renderer
+
+
+renderer = register_renderer("v1")
+
 
 # Helper function to add title and subtitle
-def add_title_slide(prs, title, subtitle, imageURL=None):
+def add_title_slide(prs, title, subtitle, imageURL=None, assets=None):
     slide_layout = prs.slide_layouts[0]  # Title Slide layout
     slide = prs.slides.add_slide(slide_layout)
     title_shape = slide.shapes.title
@@ -16,10 +17,9 @@ def add_title_slide(prs, title, subtitle, imageURL=None):
     title_shape.text = title
     subtitle_shape.text = subtitle
 
-    # Add an image if URL is provided
-    if imageURL:
-        response = requests.get(imageURL)
-        image_stream = BytesIO(response.content)
+    # Add an image if URL is provided and it was fetched
+    if imageURL and (assets or {}).get(imageURL):
+        image_stream = BytesIO(assets[imageURL])
         try:
             slide.shapes.add_picture(
                 image_stream, Inches(1), Inches(1), width=Inches(3)
@@ -63,55 +63,56 @@ def add_cta_slide(prs, headline, description, link, homepageLink):
     p.text = f"Call to Action: {link}"
 
 
-def create_pptx_from_json(data, uuid=None):
-    # Initialize presentation
-    prs = Presentation()
+@renderer.slide("HERO")
+def render_hero(prs, item, theme, assets):
+    add_title_slide(
+        prs,
+        item.get("title", ""),
+        item.get("subtitle", ""),
+        item.get("imageURL"),
+        assets,
+    )
 
-    # Process each item in the list
-    for item in data["list"]:
-        slide_type = item.get("type")
 
-        if slide_type == "HERO":
-            add_title_slide(
-                prs,
-                item.get("title", ""),
-                item.get("subtitle", ""),
-                item.get("imageURL"),
-            )
+@renderer.slide("FEATURES")
+def render_features(prs, item, theme, assets):
+    add_content_slide(
+        prs, item.get("title", "Features"), item.get("features", []), "FEATURES"
+    )
 
-        elif slide_type == "FEATURES":
-            add_content_slide(
-                prs, item.get("title", "Features"), item.get("features", []), slide_type
-            )
 
-        elif slide_type == "BENEFITS":
-            add_content_slide(
-                prs, item.get("title", "Benefits"), item.get("benefits", []), slide_type
-            )
+@renderer.slide("BENEFITS")
+def render_benefits(prs, item, theme, assets):
+    add_content_slide(
+        prs, item.get("title", "Benefits"), item.get("benefits", []), "BENEFITS"
+    )
 
-        elif slide_type == "EXPLANATION":
-            add_content_slide(
-                prs,
-                item.get("title", "Explanation"),
-                item.get("explanations", []),
-                slide_type,
-            )
 
-        elif slide_type == "TESTIMONIALS":
-            add_content_slide(
-                prs, "Testimonials", item.get("testimonials", []), slide_type
-            )
+@renderer.slide("EXPLANATION")
+def render_explanation(prs, item, theme, assets):
+    add_content_slide(
+        prs,
+        item.get("title", "Explanation"),
+        item.get("explanations", []),
+        "EXPLANATION",
+    )
+
+
+@renderer.slide("TESTIMONIALS")
+def render_testimonials(prs, item, theme, assets):
+    add_content_slide(prs, "Testimonials", item.get("testimonials", []), "TESTIMONIALS")
+
+
+@renderer.slide("CTA")
+def render_cta(prs, item, theme, assets):
+    add_cta_slide(
+        prs,
+        item.get("headline", ""),
+        item.get("description", ""),
+        item.get("link", ""),
+        item.get("homepageLink", ""),
+    )
 
-        elif slide_type == "CTA":
-            add_cta_slide(
-                prs,
-                item.get("headline", ""),
-                item.get("description", ""),
-                item.get("link", ""),
-                item.get("homepageLink", ""),
-            )
 
-    # Save the presentation to a file
-    output_filename = f"decks/{uuid}.pptx"
-    prs.save(output_filename)
-    return output_filename
+def create_pptx_from_json(data, uuid=None, assets=None, output=None):
+    return renderer.create(data, uuid, assets, output)
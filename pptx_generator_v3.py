@@ -1,12 +1,15 @@
-import requests
-from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_AUTO_SIZE
+from pptx.enum.text import PP_ALIGN
 from pptx.enum.dml import MSO_THEME_COLOR
 from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE, PP_PLACEHOLDER
 from io import BytesIO
 
+from renderer import register_renderer
+
+
+renderer = register_renderer("v3")
+
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip("#")
@@ -16,9 +19,8 @@ def hex_to_rgb(hex_color):
     )
 
 
-def create_pptx_from_json(data, uuid=None):
-    prs = Presentation()
-
+@renderer.theme
+def load_theme(data, assets):
     # Define a consistent theme color
     theme_color = None
     if data.get("color"):
@@ -32,307 +34,267 @@ def create_pptx_from_json(data, uuid=None):
 
     # Get logo image
     logo_img = None
-    if data.get("logoURL"):
+    if assets.get(data.get("logoURL")):
+        logo_img = BytesIO(assets[data["logoURL"]])
+
+    return theme_color, logo_img
+
+
+def add_logo(slide, theme):
+    # Add logo to each slide, ensure it's on top
+    _, logo_img = theme
+    if logo_img:
+        # Position logo at top-left corner
+        try:
+            logo = slide.shapes.add_picture(
+                logo_img, Inches(0.2), Inches(0.2), width=Inches(1.5)
+            )
+            # Bring logo to front
+            logo.z_order = 0  # Ensure it's on top
+        except:
+            pass
+
+
+def body_placeholder(slide):
+    # Access the content placeholder by type
+    for shape in slide.placeholders:
+        if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
+            return shape
+    # Create a textbox if placeholder not found
+    return slide.shapes.add_textbox(Inches(1), Inches(2), Inches(8), Inches(5))
+
+
+def content_slide(prs, title, theme_color, size=None, bold=False):
+    slide_layout = prs.slide_layouts[1]  # Title and Content layout
+    slide = prs.slides.add_slide(slide_layout)
+    if title:
+        title_shape = slide.shapes.title
+        title_shape.text = title
+        font = title_shape.text_frame.paragraphs[0].font
+        if size:
+            font.size = Pt(size)
+        if bold:
+            font.bold = True
+        font.color.rgb = theme_color
+
+    tf = body_placeholder(slide).text_frame
+    tf.clear()  # Remove any existing paragraphs
+    return slide, tf
+
+
+@renderer.slide("HERO")
+def add_hero_slide(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide_layout = prs.slide_layouts[0]  # Title Slide layout
+    slide = prs.slides.add_slide(slide_layout)
+
+    # Set background image if it was fetched, theme color otherwise
+    fill = slide.background.fill
+    fill.solid()
+    fill.fore_color.rgb = theme_color
+    if assets.get(item.get("imageURL")):
         try:
-            response = requests.get(data["logoURL"])
-            logo_img = BytesIO(response.content)
+            image = BytesIO(assets[item["imageURL"]])
+            # Set the background image
+            image_part = prs.part.related_parts[prs.part.relate_to_image(image)]
+            fill.fore_color.type = MSO_THEME_COLOR.ACCENT_1
+            fill.fore_color._xFill.solidFill.blipFill = image_part.blob
         except:
-            pass  # Handle error or leave logo_img as None
-
-    # Iterate over list items
-    for item in data.get("list", []):
-        if item["type"] == "HERO":
-            slide_layout = prs.slide_layouts[0]  # Title Slide layout
-            slide = prs.slides.add_slide(slide_layout)
-
-            # Set background image if imageURL is provided
-            if item.get("imageURL"):
-                try:
-                    response = requests.get(item["imageURL"])
-                    image = BytesIO(response.content)
-                    # Set the background image
-                    fill = slide.background.fill
-                    fill.solid()
-                    image_part = prs.part.related_parts[prs.part.relate_to_image(image)]
-                    fill.fore_color.type = MSO_THEME_COLOR.ACCENT_1
-                    fill.fore_color._xFill.solidFill.blipFill = image_part.blob
-                except:
-                    pass  # Handle error or skip image
-            else:
-                # Set background color if image is not available
-                fill = slide.background.fill
-                fill.solid()
-                fill.fore_color.rgb = theme_color
-
-            # Add title
-            if item.get("title"):
-                title_shape = slide.shapes.title
-                title_shape.text = item["title"]
-                title_shape.text_frame.paragraphs[0].font.size = Pt(44)
-                title_shape.text_frame.paragraphs[0].font.bold = True
-                title_shape.text_frame.paragraphs[0].font.color.rgb = RGBColor(
-                    255, 255, 255
-                )  # White text
-                title_shape.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
-
-            # Add subtitle
-            if item.get("subtitle"):
-                # Find the subtitle placeholder by type
-                subtitle_placeholder = None
-                for shape in slide.placeholders:
-                    if shape.placeholder_format.type == PP_PLACEHOLDER.SUBTITLE:
-                        subtitle_placeholder = shape
-                        break
-                if subtitle_placeholder:
-                    subtitle_placeholder.text = item["subtitle"]
-                    subtitle_placeholder.text_frame.paragraphs[0].font.size = Pt(24)
-                    subtitle_placeholder.text_frame.paragraphs[0].font.color.rgb = (
-                        RGBColor(255, 255, 255)
-                    )  # White text
-                    subtitle_placeholder.text_frame.paragraphs[0].alignment = (
-                        PP_ALIGN.CENTER
-                    )
-                else:
-                    # If subtitle placeholder not found, create a textbox
-                    left = Inches(1)
-                    top = Inches(4)
-                    width = prs.slide_width - Inches(2)
-                    height = Inches(1)
-                    txBox = slide.shapes.add_textbox(left, top, width, height)
-                    tf = txBox.text_frame
-                    tf.text = item["subtitle"]
-                    tf.paragraphs[0].font.size = Pt(24)
-                    tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
-                    tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-
-        elif item["type"] == "FEATURES":
-            slide_layout = prs.slide_layouts[1]  # Title and Content layout
-            slide = prs.slides.add_slide(slide_layout)
-
-            # Add title
-            if item.get("title"):
-                title_shape = slide.shapes.title
-                title_shape.text = item["title"]
-                title_shape.text_frame.paragraphs[0].font.size = Pt(36)
-                title_shape.text_frame.paragraphs[0].font.bold = True
-                title_shape.text_frame.paragraphs[0].font.color.rgb = theme_color
-
-            # Access the content placeholder by type
-            body_shape = None
-            for shape in slide.placeholders:
-                if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
-                    body_shape = shape
-                    break
-            if body_shape is None:
-                # Create a textbox if placeholder not found
-                body_shape = slide.shapes.add_textbox(
-                    Inches(1), Inches(2), Inches(8), Inches(5)
-                )
-
-            tf = body_shape.text_frame
-            tf.clear()  # Remove any existing paragraphs
-            for feature in item.get("features", []):
-                p = tf.add_paragraph()
-                p.text = f"{feature.get('emoji', '')} {feature.get('title', '')}: {feature.get('description', '')}"
-                p.font.size = Pt(24)
-                p.level = 0
-
-        elif item["type"] == "BENEFITS":
-            slide_layout = prs.slide_layouts[1]  # Title and Content layout
-            slide = prs.slides.add_slide(slide_layout)
-
-            # Add title
-            if item.get("title"):
-                title_shape = slide.shapes.title
-                title_shape.text = item["title"]
-                title_shape.text_frame.paragraphs[0].font.size = Pt(36)
-                title_shape.text_frame.paragraphs[0].font.bold = True
-                title_shape.text_frame.paragraphs[0].font.color.rgb = theme_color
-
-            # Access the content placeholder by type
-            body_shape = None
-            for shape in slide.placeholders:
-                if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
-                    body_shape = shape
-                    break
-            if body_shape is None:
-                # Create a textbox if placeholder not found
-                body_shape = slide.shapes.add_textbox(
-                    Inches(1), Inches(2), Inches(8), Inches(5)
-                )
-
-            tf = body_shape.text_frame
-            tf.clear()
-            for benefit in item.get("benefits", []):
-                p = tf.add_paragraph()
-                p.text = f"{benefit.get('emoji', '')} {benefit.get('name', '')}: {benefit.get('description', '')}"
-                p.font.size = Pt(24)
-                p.level = 0
-
-        elif item["type"] == "EXPLANATION":
-            slide_layout = prs.slide_layouts[1]  # Title and Content layout
-            slide = prs.slides.add_slide(slide_layout)
-
-            # Title
-            slide.shapes.title.text = "Explanation"
-            slide.shapes.title.text_frame.paragraphs[0].font.color.rgb = theme_color
-
-            # Access the content placeholder
-            body_shape = None
-            for shape in slide.placeholders:
-                if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
-                    body_shape = shape
-                    break
-            if body_shape is None:
-                body_shape = slide.shapes.add_textbox(
-                    Inches(1), Inches(2), Inches(8), Inches(5)
-                )
-
-            tf = body_shape.text_frame
-            tf.clear()
-            for explanation in item.get("explanations", []):
-                # Title
-                p = tf.add_paragraph()
-                p.text = (
-                    f"{explanation.get('emoji', '')} {explanation.get('title', '')}"
-                )
-                p.font.size = Pt(28)
-                p.font.bold = True
-                p.font.color.rgb = theme_color
-                p.level = 0
-
-                # Description
-                p = tf.add_paragraph()
-                p.text = explanation.get("description", "")
-                p.font.size = Pt(24)
-                p.level = 1
-
-        elif item["type"] == "TESTIMONIALS":
-            testimonials = item.get("testimonials", [])
-            for testimonial in testimonials:
-                slide_layout = prs.slide_layouts[1]  # Title and Content layout
-                slide = prs.slides.add_slide(slide_layout)
-
-                # Title
-                slide.shapes.title.text = "Testimonial"
-                slide.shapes.title.text_frame.paragraphs[0].font.color.rgb = theme_color
-
-                # Access the content placeholder
-                body_shape = None
-                for shape in slide.placeholders:
-                    if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
-                        body_shape = shape
-                        break
-                if body_shape is None:
-                    body_shape = slide.shapes.add_textbox(
-                        Inches(1), Inches(2), Inches(8), Inches(5)
-                    )
-
-                tf = body_shape.text_frame
-                tf.clear()
-
-                # Testimonial text
-                p = tf.add_paragraph()
-                p.text = f'"{testimonial.get("testimonial", "")}"'
-                p.font.size = Pt(24)
-                p.font.italic = True
-                p.font.color.rgb = RGBColor(89, 89, 89)  # Dark grey
-                p.level = 0
-
-                # Name
-                p = tf.add_paragraph()
-                p.text = f"- {testimonial.get('firstName', '')} {testimonial.get('lastName', '')}"
-                p.font.size = Pt(22)
-                p.font.bold = True
-                p.font.color.rgb = theme_color
-                p.level = 0
-
-        elif item["type"] == "CTA":
-            slide_layout = prs.slide_layouts[6]  # Blank layout
-            slide = prs.slides.add_slide(slide_layout)
-
-            # Add background color
-            fill = slide.background.fill
-            fill.solid()
-            fill.fore_color.rgb = theme_color
-
-            # Add headline
-            if item.get("headline"):
-                left = Inches(1)
-                top = Inches(2)
-                width = prs.slide_width - Inches(2)
-                height = Inches(1)
-                txBox = slide.shapes.add_textbox(left, top, width, height)
-                tf = txBox.text_frame
-                tf.text = item["headline"]
-                tf.paragraphs[0].font.size = Pt(44)
-                tf.paragraphs[0].font.bold = True
-                tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
-                tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-
-            # Add description
-            if item.get("description"):
-                left = Inches(1)
-                top = Inches(3.5)
-                width = prs.slide_width - Inches(2)
-                height = Inches(1)
-                txBox = slide.shapes.add_textbox(left, top, width, height)
-                tf = txBox.text_frame
-                tf.text = item["description"]
-                tf.paragraphs[0].font.size = Pt(24)
-                tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
-                tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-
-            # Add Call to Action button
-            if item.get("link"):
-                # Create a rectangle shape as a button
-                left = (prs.slide_width - Inches(3)) / 2
-                top = Inches(5)
-                width = Inches(3)
-                height = Inches(0.8)
-                button = slide.shapes.add_shape(
-                    MSO_AUTO_SHAPE_TYPE.ROUNDED_RECTANGLE, left, top, width, height
-                )
-                button.fill.solid()
-                button.fill.fore_color.rgb = RGBColor(255, 255, 255)
-                button.line.color.rgb = RGBColor(255, 255, 255)
-
-                # Add text to the button
-                tf = button.text_frame
-                p = tf.paragraphs[0]
-                p.text = "Sign Up Now"
-                p.font.size = Pt(24)
-                p.font.bold = True
-                p.font.color.rgb = theme_color
-                p.alignment = PP_ALIGN.CENTER
-
-            # Add homepage link as text
-            if item.get("homepageLink"):
-                left = Inches(1)
-                top = Inches(6)
-                width = prs.slide_width - Inches(2)
-                height = Inches(0.5)
-                txBox = slide.shapes.add_textbox(left, top, width, height)
-                tf = txBox.text_frame
-                p = tf.paragraphs[0]
-                p.text = f"Visit our homepage: {item['homepageLink']}"
-                p.font.size = Pt(18)
-                p.font.color.rgb = RGBColor(255, 255, 255)
-                p.alignment = PP_ALIGN.CENTER
-
-        # Add logo to each slide, ensure it's on top
-        if logo_img:
-            # Position logo at top-left corner
-            try:
-                logo = slide.shapes.add_picture(
-                    logo_img, Inches(0.2), Inches(0.2), width=Inches(1.5)
-                )
-                # Bring logo to front
-                logo.z_order = 0  # Ensure it's on top
-            except:
-                pass
-
-    # Save the presentation to a file
-    output_filename = f"decks/{uuid}.pptx"
-    prs.save(output_filename)
-    return output_filename
+            fill.fore_color.rgb = theme_color  # Handle error or skip image
+
+    # Add title
+    if item.get("title"):
+        title_shape = slide.shapes.title
+        title_shape.text = item["title"]
+        title_shape.text_frame.paragraphs[0].font.size = Pt(44)
+        title_shape.text_frame.paragraphs[0].font.bold = True
+        title_shape.text_frame.paragraphs[0].font.color.rgb = RGBColor(
+            255, 255, 255
+        )  # White text
+        title_shape.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+
+    # Add subtitle
+    if item.get("subtitle"):
+        # Find the subtitle placeholder by type
+        subtitle_placeholder = None
+        for shape in slide.placeholders:
+            if shape.placeholder_format.type == PP_PLACEHOLDER.SUBTITLE:
+                subtitle_placeholder = shape
+                break
+        if subtitle_placeholder:
+            subtitle_placeholder.text = item["subtitle"]
+            subtitle_placeholder.text_frame.paragraphs[0].font.size = Pt(24)
+            subtitle_placeholder.text_frame.paragraphs[0].font.color.rgb = RGBColor(
+                255, 255, 255
+            )  # White text
+            subtitle_placeholder.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
+        else:
+            # If subtitle placeholder not found, create a textbox
+            left = Inches(1)
+            top = Inches(4)
+            width = prs.slide_width - Inches(2)
+            height = Inches(1)
+            txBox = slide.shapes.add_textbox(left, top, width, height)
+            tf = txBox.text_frame
+            tf.text = item["subtitle"]
+            tf.paragraphs[0].font.size = Pt(24)
+            tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
+            tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+
+    add_logo(slide, theme)
+
+
+@renderer.slide("FEATURES")
+def add_features_slide(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide, tf = content_slide(prs, item.get("title", ""), theme_color, 36, True)
+    for feature in item.get("features", []):
+        p = tf.add_paragraph()
+        p.text = f"{feature.get('emoji', '')} {feature.get('title', '')}: {feature.get('description', '')}"
+        p.font.size = Pt(24)
+        p.level = 0
+    add_logo(slide, theme)
+
+
+@renderer.slide("BENEFITS")
+def add_benefits_slide(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide, tf = content_slide(prs, item.get("title", ""), theme_color, 36, True)
+    for benefit in item.get("benefits", []):
+        p = tf.add_paragraph()
+        p.text = f"{benefit.get('emoji', '')} {benefit.get('name', '')}: {benefit.get('description', '')}"
+        p.font.size = Pt(24)
+        p.level = 0
+    add_logo(slide, theme)
+
+
+@renderer.slide("EXPLANATION")
+def add_explanation_slide(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide, tf = content_slide(prs, "Explanation", theme_color)
+    for explanation in item.get("explanations", []):
+        # Title
+        p = tf.add_paragraph()
+        p.text = f"{explanation.get('emoji', '')} {explanation.get('title', '')}"
+        p.font.size = Pt(28)
+        p.font.bold = True
+        p.font.color.rgb = theme_color
+        p.level = 0
+
+        # Description
+        p = tf.add_paragraph()
+        p.text = explanation.get("description", "")
+        p.font.size = Pt(24)
+        p.level = 1
+    add_logo(slide, theme)
+
+
+@renderer.slide("TESTIMONIALS")
+def add_testimonial_slides(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide = None
+    for testimonial in item.get("testimonials", []):
+        slide, tf = content_slide(prs, "Testimonial", theme_color)
+
+        # Testimonial text
+        p = tf.add_paragraph()
+        p.text = f'"{testimonial.get("testimonial", "")}"'
+        p.font.size = Pt(24)
+        p.font.italic = True
+        p.font.color.rgb = RGBColor(89, 89, 89)  # Dark grey
+        p.level = 0
+
+        # Name
+        p = tf.add_paragraph()
+        p.text = (
+            f"- {testimonial.get('firstName', '')} {testimonial.get('lastName', '')}"
+        )
+        p.font.size = Pt(22)
+        p.font.bold = True
+        p.font.color.rgb = theme_color
+        p.level = 0
+    # Only the last testimonial slide carries the logo
+    if slide is not None:
+        add_logo(slide, theme)
+
+
+@renderer.slide("CTA")
+def add_cta_slide(prs, item, theme, assets):
+    theme_color, _ = theme
+    slide_layout = prs.slide_layouts[6]  # Blank layout
+    slide = prs.slides.add_slide(slide_layout)
+
+    # Add background color
+    fill = slide.background.fill
+    fill.solid()
+    fill.fore_color.rgb = theme_color
+
+    # Add headline
+    if item.get("headline"):
+        left = Inches(1)
+        top = Inches(2)
+        width = prs.slide_width - Inches(2)
+        height = Inches(1)
+        txBox = slide.shapes.add_textbox(left, top, width, height)
+        tf = txBox.text_frame
+        tf.text = item["headline"]
+        tf.paragraphs[0].font.size = Pt(44)
+        tf.paragraphs[0].font.bold = True
+        tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
+        tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+
+    # Add description
+    if item.get("description"):
+        left = Inches(1)
+        top = Inches(3.5)
+        width = prs.slide_width - Inches(2)
+        height = Inches(1)
+        txBox = slide.shapes.add_textbox(left, top, width, height)
+        tf = txBox.text_frame
+        tf.text = item["description"]
+        tf.paragraphs[0].font.size = Pt(24)
+        tf.paragraphs[0].font.color.rgb = RGBColor(255, 255, 255)
+        tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+
+    # Add Call to Action button
+    if item.get("link"):
+        # Create a rectangle shape as a button
+        left = (prs.slide_width - Inches(3)) / 2
+        top = Inches(5)
+        width = Inches(3)
+        height = Inches(0.8)
+        button = slide.shapes.add_shape(
+            MSO_AUTO_SHAPE_TYPE.ROUNDED_RECTANGLE, left, top, width, height
+        )
+        button.fill.solid()
+        button.fill.fore_color.rgb = RGBColor(255, 255, 255)
+        button.line.color.rgb = RGBColor(255, 255, 255)
+
+        # Add text to the button
+        tf = button.text_frame
+        p = tf.paragraphs[0]
+        p.text = "Sign Up Now"
+        p.font.size = Pt(24)
+        p.font.bold = True
+        p.font.color.rgb = theme_color
+        p.alignment = PP_ALIGN.CENTER
+
+    # Add homepage link as text
+    if item.get("homepageLink"):
+        left = Inches(1)
+        top = Inches(6)
+        width = prs.slide_width - Inches(2)
+        height = Inches(0.5)
+        txBox = slide.shapes.add_textbox(left, top, width, height)
+        tf = txBox.text_frame
+        p = tf.paragraphs[0]
+        p.text = f"Visit our homepage: {item['homepageLink']}"
+        p.font.size = Pt(18)
+        p.font.color.rgb = RGBColor(255, 255, 255)
+        p.alignment = PP_ALIGN.CENTER
+
+    add_logo(slide, theme)
+
+
+def create_pptx_from_json(data, uuid=None, assets=None, output=None):
+    return renderer.create(data, uuid, assets, output)
@@ -0,0 +1,173 @@
+import hashlib
+import posixpath
+import re
+import zipfile
+
+from io import BytesIO
+
+from renderer import SLIDE_NAME_PREFIX
+
+
+# Relationship types a patched slide may carry: anything else (notes, charts,
+# embedded objects) would need more parts copied, so those decks are re-rendered
+PATCHABLE_RELATIONSHIPS = ("/slideLayout", "/image", "/hyperlink")
+
+_RELATIONSHIP = re.compile(rb"<Relationship\b[^>]*/>")
+_ATTRIBUTE = re.compile(rb'([\w:]+)="([^"]*)"')
+_SLIDE_ID = re.compile(rb"<p:sldId\b[^>]*/>")
+_SLIDE_NAME = re.compile(rb'<p:cSld\b[^>]*\bname="([^"]*)"')
+_DEFAULT = re.compile(rb'<Default\b[^>]*Extension="([^"]+)"[^>]*/>')
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _attributes(raw):
+    return {key.decode(): value.decode() for key, value in _ATTRIBUTE.findall(raw)}
+
+
+def _rels_name(part):
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _parse_relationships(content):
+    # [(attributes, raw element)] of a .rels part
+    return [(_attributes(raw), raw) for raw in _RELATIONSHIP.findall(content)]
+
+
+def _relationships(package, part):
+    rels = _rels_name(part)
+    if rels not in package.NameToInfo:
+        return rels, []
+    return rels, _parse_relationships(package.read(rels))
+
+
+def _source_part(rels_name):
+    # ppt/slides/_rels/slide1.xml.rels -> ppt/slides/slide1.xml
+    directory, name = posixpath.split(rels_name)
+    return posixpath.join(posixpath.dirname(directory), name[: -len(".rels")])
+
+
+def _target(part, relationship):
+    return posixpath.normpath(
+        posixpath.join(posixpath.dirname(part), relationship["Target"])
+    )
+
+
+def slide_parts(package):
+    # Slide part names in presentation order
+    _, relationships = _relationships(package, "ppt/presentation.xml")
+    targets = {
+        attrs["Id"]: _target("ppt/presentation.xml", attrs)
+        for attrs, _ in relationships
+    }
+    presentation = package.read("ppt/presentation.xml")
+    return [
+        targets[_attributes(raw)["r:id"]] for raw in _SLIDE_ID.findall(presentation)
+    ]
+
+
+def item_slide_parts(package, index):
+    # Slides rendered from deck item `index` (see Renderer.render)
+    name = f"{SLIDE_NAME_PREFIX}{index}".encode()
+    return [
+        part
+        for part in slide_parts(package)
+        if (match := _SLIDE_NAME.search(package.read(part))) and match.group(1) == name
+    ]
+
+
+def patch_item(pptx_content, index, item_content):
+    # Replaces the slides of deck item `index` in pptx_content with the slides
+    # in item_content (a package rendered by Renderer.create_item). Other
+    # slides and their media are copied untouched; media the item's slides
+    # share with the rest of the deck (the logo) are reused by content hash.
+    # Raises PatchError when the deck can't be patched in place.
+    old = zipfile.ZipFile(BytesIO(pptx_content))
+    new = zipfile.ZipFile(BytesIO(item_content))
+    old_parts = item_slide_parts(old, index)
+    new_parts = slide_parts(new)
+    if not old_parts:
+        raise PatchError(f"No slides tagged for deck item {index}")
+    if len(old_parts) != len(new_parts):
+        raise PatchError(
+            f"Deck item {index} now renders {len(new_parts)} slides "
+            f"instead of {len(old_parts)}"
+        )
+
+    media = {}  # sha256 -> part name
+    for name in old.namelist():
+        if name.startswith("ppt/media/"):
+            media[hashlib.sha256(old.read(name)).hexdigest()] = name
+    added_media = {}
+    replacements = {}
+    for old_part, new_part in zip(old_parts, new_parts):
+        rels_name, relationships = _relationships(new, new_part)
+        rels = new.read(rels_name)
+        for attrs, raw in relationships:
+            if not attrs["Type"].endswith(PATCHABLE_RELATIONSHIPS):
+                raise PatchError(f"Unsupported relationship {attrs['Type']}")
+            if attrs.get("TargetMode") == "External":
+                continue
+            if not attrs["Type"].endswith("/image"):
+                # Layouts come from the same template in both packages
+                if _target(new_part, attrs) not in old.NameToInfo:
+                    raise PatchError(f"Missing part {attrs['Target']}")
+                continue
+            content = new.read(_target(new_part, attrs))
+            digest = hashlib.sha256(content).hexdigest()
+            if digest not in media:
+                extension = posixpath.splitext(attrs["Target"])[1]
+                media[digest] = f"ppt/media/image-{digest[:16]}{extension}"
+                added_media[media[digest]] = content
+            target = posixpath.relpath(media[digest], posixpath.dirname(old_part))
+            retargeted = raw.replace(
+                f'Target="{attrs["Target"]}"'.encode(), f'Target="{target}"'.encode()
+            )
+            rels = rels.replace(raw, retargeted)
+        replacements[old_part] = new.read(new_part)
+        replacements[_rels_name(old_part)] = rels
+
+    # Media nothing refers to any more (e.g. the edited slide's old image)
+    referenced = set()
+    for name in old.namelist():
+        if name.endswith(".rels"):
+            content = replacements.get(name) or old.read(name)
+            part = _source_part(name)
+            referenced.update(
+                _target(part, attrs) for attrs, _ in _parse_relationships(content)
+            )
+
+    content_types = old.read("[Content_Types].xml")
+    known = {extension.lower() for extension in _DEFAULT.findall(content_types)}
+    for name in added_media:
+        extension = posixpath.splitext(name)[1][1:].encode()
+        if extension.lower() not in known:
+            default = next(
+                raw
+                for raw in _DEFAULT.finditer(new.read("[Content_Types].xml"))
+                if raw.group(1).lower() == extension.lower()
+            ).group(0)
+            content_types = content_types.replace(
+                b"<Default ", default + b"<Default ", 1
+            )
+            known.add(extension.lower())
+    replacements["[Content_Types].xml"] = content_types
+
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as patched:
+        for info in old.infolist():
+            if (
+                info.filename.startswith("ppt/media/")
+                and info.filename not in referenced
+            ):
+                continue
+            content = replacements.get(info.filename)
+            if content is None:
+                content = old.read(info.filename)
+            patched.writestr(info, content, compress_type=info.compress_type)
+        for name, content in added_media.items():
+            patched.writestr(name, content)
+    return output.getvalue()
@@ -0,0 +1,64 @@
+import copy
+import os
+import threading
+
+from pathlib import Path
+
+
+TEMPLATE_DIR = Path(
+    os.environ.get("TEMPLATE_DIR", str(Path(__file__).parent / "templates"))
+)
+
+
+class TemplateManager:
+    # Parses each .pptx template once per process and hands out deep copies.
+    # Copying the parsed package is several times cheaper than Presentation(),
+    # which unzips and parses the template with all its layouts and masters.
+    # python-pptx itself is only imported by the first load.
+    def __init__(self, directory=TEMPLATE_DIR):
+        self.directory = Path(directory)
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        if name == "default":
+            return None  # python-pptx's bundled default template
+        path = self.directory / f"{name}.pptx"
+        if path.parent != self.directory or not path.exists():
+            raise KeyError(f"Unknown template: {name}")
+        return path
+
+    def load(self, name="default"):
+        with self._lock:
+            if name not in self._templates:
+                from pptx import Presentation
+
+                path = self._path(name)
+                self._templates[name] = Presentation(str(path) if path else None)
+            return self._templates[name]
+
+    def new(self, name="default"):
+        template = self.load(name)
+        with self._lock:
+            return copy.deepcopy(template)
+
+    def preload(self):
+        self.load("default")
+        for path in sorted(self.directory.glob("*.pptx")):
+            self.load(path.stem)
+
+
+templates = TemplateManager()
+
+
+def new_presentation(template="default"):
+    return templates.new(template)
+
+
+def save_presentation(prs, uuid=None, output=None):
+    # Renders into `output` (a path or writable binary buffer such as BytesIO)
+    # when given; otherwise keeps the historical decks/{uuid}.pptx file
+    if output is None:
+        output = f"decks/{uuid}.pptx"
+    prs.save(output)
+    return output
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import threading
+import time
+
+from pathlib import Path
+
+
+PROMPTS_DIR = Path(
+    os.environ.get("PROMPTS_DIR", str(Path(__file__).parent / "prompts"))
+)
+# How often (seconds) get() checks the template files for changes; 0 disables reload
+PROMPT_RELOAD_INTERVAL = float(os.environ.get("PROMPT_RELOAD_INTERVAL", "2"))
+
+
+class Prompt:
+    def __init__(self, name, text, mtime):
+        self.name = name
+        self.text = text
+        self.mtime = mtime
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+class PromptRegistry:
+    # Loads prompts/*.txt once and serves them from memory. Each template gets a
+    # content version; edits on disk are picked up by an mtime check that runs
+    # at most once per reload interval.
+    def __init__(self, directory=PROMPTS_DIR, reload_interval=PROMPT_RELOAD_INTERVAL):
+        self.directory = Path(directory)
+        self.reload_interval = reload_interval
+        self._prompts = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name):
+        path = self.directory / f"{name}.txt"
+        mtime = path.stat().st_mtime_ns
+        prompt = Prompt(name, path.read_text(), mtime)
+        self._prompts[name] = prompt
+        self._checked_at[name] = time.monotonic()
+        return prompt
+
+    def load_all(self):
+        with self._lock:
+            for path in sorted(self.directory.glob("*.txt")):
+                self._load(path.stem)
+        return dict(self._prompts)
+
+    def get(self, name):
+        with self._lock:
+            prompt = self._prompts.get(name)
+            if prompt is None:
+                return self._load(name)
+            if (
+                self.reload_interval
+                and time.monotonic() - self._checked_at[name] > self.reload_interval
+            ):
+                self._checked_at[name] = time.monotonic()
+                path = self.directory / f"{name}.txt"
+                if path.stat().st_mtime_ns != prompt.mtime:
+                    return self._load(name)
+            return prompt
+
+
+prompts = PromptRegistry()
+
+
+def get_prompt(name):
+    return prompts.get(name)
@@ -0,0 +1,229 @@
+import importlib
+import os
+import threading
+import time
+
+from assets import prefetch_assets
+from pptx_templates import new_presentation, save_presentation
+from slide_cache import (
+    SLIDE_CACHE,
+    add_cached_slides,
+    capture_slides,
+    renderer_version,
+    slide_cache,
+    slide_key,
+    theme_context,
+)
+
+
+DECK_RENDERER = os.environ.get("DECK_RENDERER", "v2")
+
+# Every slide is named after the deck item it was rendered from, so a single
+# item's slides can be found (and patched) in a saved package
+SLIDE_NAME_PREFIX = "deck-item-"
+
+# Renderer name -> module that registers it on import
+RENDERER_MODULES = {
+    "v1": "pptx_generator",
+    "v2": "pptx_generator_v2",
+    "v3": "pptx_generator_v3",
+}
+
+
+class RenderTimings:
+    # Per (renderer, slide type) wall-clock totals for slide renders. Hooks are
+    # called with (renderer, slide_type, seconds) after every slide.
+    def __init__(self):
+        self.hooks = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, renderer, slide_type, seconds):
+        with self._lock:
+            stats = self._stats.setdefault(
+                (renderer, slide_type), {"count": 0, "seconds": 0.0, "max": 0.0}
+            )
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+        for hook in self.hooks:
+            hook(renderer, slide_type, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: -kv[1]["seconds"])
+            return [
+                {
+                    "renderer": renderer,
+                    "type": slide_type,
+                    "count": stats["count"],
+                    "seconds": round(stats["seconds"], 6),
+                    "mean": round(stats["seconds"] / stats["count"], 6),
+                    "max": round(stats["max"], 6),
+                }
+                for (renderer, slide_type), stats in items
+            ]
+
+
+render_timings = RenderTimings()
+
+
+class Renderer:
+    # A set of slide renderers keyed by deck item type. Each renderer is called
+    # as fn(prs, item, theme, assets); theme is whatever the renderer's theme
+    # loader derived from the deck header (colours, logo, ...).
+    def __init__(self, name):
+        self.name = name
+        self.slides = {}
+        self._default = None
+        self._theme = None
+        self._version = None
+
+    def slide(self, slide_type):
+        def register(fn):
+            self.slides[slide_type] = fn
+            return fn
+
+        return register
+
+    def default(self, fn):
+        # Renders item types that have no function of their own
+        self._default = fn
+        return fn
+
+    def theme(self, fn):
+        self._theme = fn
+        return fn
+
+    @property
+    def version(self):
+        # Part of the slide cache key, so cached slides die with code changes
+        if self._version is None:
+            self._version = renderer_version(RENDERER_MODULES.get(self.name)) or ""
+        return self._version
+
+    def load_theme(self, data, assets):
+        return self._theme(data, assets) if self._theme else None
+
+    def render(self, prs, item, theme, assets, index=None, context=None):
+        # context: theme_context() of the deck header. When given, the item's
+        # slides are copied from the slide cache if this item was rendered
+        # before with the same theme and images.
+        slide_type = item.get("type")
+        fn = self.slides.get(slide_type, self._default)
+        if fn is None:
+            return  # unknown slide types are skipped
+        before = len(prs.slides)
+        started_at = time.perf_counter()
+        key = None
+        if SLIDE_CACHE and context is not None and self.version:
+            key = slide_key(self, item, context, assets)
+        entries = slide_cache.get(key) if key else None
+        if entries is None or not add_cached_slides(prs, entries):
+            fn(prs, item, theme, assets)
+            if key:
+                entries = capture_slides(list(prs.slides)[before:])
+                if entries is not None:
+                    slide_cache.set(key, entries)
+        render_timings.observe(self.name, slide_type, time.perf_counter() - started_at)
+        if index is not None:
+            for slide in list(prs.slides)[before:]:
+                slide.name = f"{SLIDE_NAME_PREFIX}{index}"
+
+    def create(self, data, uuid=None, assets=None, output=None):
+        prs = new_presentation()
+        if assets is None:
+            assets = prefetch_assets(data)
+        theme = self.load_theme(data, assets)
+        context = theme_context(data, assets)
+        for index, item in enumerate(data.get("list", [])):
+            self.render(prs, item, theme, assets, index, context)
+        return save_presentation(prs, uuid, output)
+
+    def create_item(self, data, index, assets=None, output=None):
+        # A presentation holding only deck item `index`, themed like the full
+        # deck; only that item's images (and the logo) are fetched
+        item = data["list"][index]
+        if assets is None:
+            assets = prefetch_assets({**data, "list": [item]})
+        prs = new_presentation()
+        theme = self.load_theme(data, assets)
+        self.render(prs, item, theme, assets, index, theme_context(data, assets))
+        return save_presentation(prs, output=output)
+
+
+renderers = {}
+
+
+def register_renderer(name):
+    renderers[name] = Renderer(name)
+    return renderers[name]
+
+
+def get_renderer(name=None):
+    # Raises KeyError for names that are not registered
+    name = name or DECK_RENDERER
+    if name not in renderers and name in RENDERER_MODULES:
+        importlib.import_module(RENDERER_MODULES[name])
+    return renderers[name]
+
+
+def create_pptx(data, renderer=None, uuid=None, assets=None, output=None):
+    # The deck itself may pin a renderer with a top-level "renderer" key
+    return get_renderer(renderer or data.get("renderer")).create(
+        data, uuid, assets, output
+    )
+
+
+class StreamingDeck:
+    # Renders slides as soon as each deck item is parsed. Slides that depend on
+    # data resolved after the LLM stream ends (the HERO image) are deferred and
+    # rendered in finish(); slide order always follows the deck list order.
+    def __init__(self, header, renderer=None, defer=("HERO",)):
+        self.renderer = get_renderer(renderer)
+        self.prs = new_presentation()
+        self.assets = prefetch_assets(header)
+        self.theme = self.renderer.load_theme(header, self.assets)
+        self.context = theme_context(header, self.assets)
+        self.defer = defer
+        self.rendered = {}
+        self.deferred = []
+
+    def add(self, index, item):
+        if item.get("type") in self.defer:
+            self.deferred.append(index)
+            return
+        # Per-slide images are fetched as their item arrives
+        self.prefetch(item)
+        self._render(index, item)
+
+    def _render(self, index, item):
+        slide_ids = self.prs.slides._sldIdLst
+        before = len(slide_ids)
+        self.renderer.render(
+            self.prs, item, self.theme, self.assets, index, self.context
+        )
+        self.rendered[index] = list(slide_ids)[before:]
+
+    def prefetch(self, data):
+        # Fetches images that were not in the header: an item's own, or the
+        # HERO image
+        self.assets = prefetch_assets(data, known=self.assets)
+
+    def finish(self, data, uuid=None, output=None):
+        items = data.get("list", [])
+        self.prefetch(data)
+        for index in self.deferred:
+            self._render(index, items[index])
+        # Catch up on anything the stream parser did not emit
+        for index, item in enumerate(items):
+            if index not in self.rendered:
+                self._render(index, item)
+
+        slide_ids = self.prs.slides._sldIdLst
+        for index in sorted(self.rendered):
+            for slide_id in self.rendered[index]:
+                slide_ids.remove(slide_id)
+                slide_ids.append(slide_id)
+
+        return save_presentation(self.prs, uuid, output)
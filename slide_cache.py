@@ -0,0 +1,156 @@
+import hashlib
+import importlib.util
+import os
+import weakref
+
+from io import BytesIO
+from pathlib import Path
+
+from assets import asset_store, collect_image_urls
+from cache import DiskCache, LRUCache, TieredCache, make_key
+
+
+# Rendered slides are memoized per (item JSON, theme color, logo, item images,
+# renderer version) and later decks are assembled from the stored slide XML
+# instead of re-running the slide renderer
+SLIDE_CACHE = os.environ.get("SLIDE_CACHE", "1") == "1"
+SLIDE_CACHE_SIZE = int(os.environ.get("SLIDE_CACHE_SIZE", "1024"))
+SLIDE_CACHE_TTL = float(os.environ.get("SLIDE_CACHE_TTL", "604800"))
+SLIDE_CACHE_DIR = os.environ.get(
+    "SLIDE_CACHE_DIR", str(Path(__file__).parent / ".cache" / "slides")
+)
+
+slide_cache = TieredCache(
+    LRUCache(SLIDE_CACHE_SIZE, ttl=SLIDE_CACHE_TTL),
+    DiskCache(SLIDE_CACHE_DIR, ttl=SLIDE_CACHE_TTL) if SLIDE_CACHE_DIR else None,
+    name="slide",
+)
+
+# Presentation part -> {media digest: image part}, so a cached slide's images are
+# related without walking the package and hashing the blob every time
+_image_parts = weakref.WeakKeyDictionary()
+
+# Slide XML attributes that point at one of the slide's relationships (r:id,
+# r:embed, r:link), spelled out so python-pptx is only imported to render
+RELATIONSHIP_NAMESPACE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+RELATIONSHIP_ATTRIBUTES = tuple(
+    f"{{{RELATIONSHIP_NAMESPACE}}}{name}" for name in ("id", "embed", "link")
+)
+
+
+def _digest(content):
+    return content and hashlib.sha256(content).hexdigest()
+
+
+def renderer_version(module):
+    # Changes whenever the renderer's source or python-pptx does; None (no
+    # caching) for renderers not defined in an importable module
+    spec = importlib.util.find_spec(module) if module else None
+    if spec is None or spec.origin is None:
+        return None
+    import pptx
+
+    source = Path(spec.origin).read_bytes()
+    return make_key(_digest(source), pptx.__version__)
+
+
+def theme_context(data, assets):
+    # The parts of the deck header the theme loaders read
+    return {
+        "color": data.get("color", ""),
+        "logo": _digest(assets.get(data.get("logoURL"))),
+    }
+
+
+def slide_key(renderer, item, context, assets):
+    images = [_digest(assets.get(url)) for url in collect_image_urls(item)]
+    return make_key("slide", renderer.name, renderer.version, item, context, images)
+
+
+def capture_slides(slides):
+    # JSON-able copy of freshly rendered slides, or None if one of them relates
+    # to something other than its layout, images and hyperlinks
+    from lxml import etree
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+    entries = []
+    for slide in slides:
+        rels = []
+        for rel in slide.part.rels.values():
+            entry = {"id": rel.rId, "type": rel.reltype}
+            if rel.is_external:
+                entry["url"] = rel.target_ref
+            elif rel.reltype == RT.SLIDE_LAYOUT:
+                entry["layout"] = str(rel.target_part.partname)
+            elif rel.reltype == RT.IMAGE:
+                entry["media"] = asset_store.put_blob(rel.target_part.blob)
+            else:
+                return None
+            rels.append(entry)
+        xml = etree.tostring(slide._element, encoding="unicode")
+        entries.append({"xml": xml, "rels": rels})
+    return entries
+
+
+def add_cached_slides(prs, entries):
+    # Appends captured slides to prs; False (and nothing added) if some media
+    # has been evicted from the asset store since
+    from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+    from pptx.oxml import parse_xml
+
+    media = {}
+    for entry in entries:
+        for rel in entry["rels"]:
+            if "media" in rel and rel["media"] not in media:
+                media[rel["media"]] = asset_store.get_blob(rel["media"])
+                if media[rel["media"]] is None:
+                    return False
+    layouts = {str(layout.part.partname): layout for layout in prs.slide_layouts}
+    if any(
+        rel["layout"] not in layouts
+        for entry in entries
+        for rel in entry["rels"]
+        if "layout" in rel
+    ):
+        return False
+
+    image_parts = _image_parts.setdefault(prs.part, {})
+    for entry in entries:
+        layout = next(rel["layout"] for rel in entry["rels"] if "layout" in rel)
+        # Like prs.slides.add_slide(), minus cloning the layout placeholders
+        # that the cached content replaces anyway
+        rId, slide = prs.part.add_slide(layouts[layout])
+        prs.slides._sldIdLst.add_sldId(rId)
+        part = slide.part
+        ids = {}
+        for rel in entry["rels"]:
+            if "layout" in rel:
+                ids[rel["id"]] = next(
+                    new_id
+                    for new_id, new in part.rels.items()
+                    if new.reltype == RT.SLIDE_LAYOUT
+                )
+            elif "media" in rel:
+                if rel["media"] not in image_parts:
+                    image_parts[rel["media"]], _ = part.get_or_add_image_part(
+                        BytesIO(media[rel["media"]])
+                    )
+                ids[rel["id"]] = part.relate_to(image_parts[rel["media"]], RT.IMAGE)
+            else:
+                ids[rel["id"]] = part.relate_to(
+                    rel["url"], rel["type"], is_external=True
+                )
+
+        cached = parse_xml(entry["xml"])
+        for element in cached.iter():
+            for attribute in RELATIONSHIP_ATTRIBUTES:
+                if element.get(attribute) in ids:
+                    element.set(attribute, ids[element.get(attribute)])
+        # Keep the slide element python-pptx already holds and swap its content
+        element = slide._element
+        element.attrib.clear()
+        element.attrib.update(cached.attrib)
+        element[:] = list(cached)
+    return True
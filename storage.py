@@ -0,0 +1,405 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from dotenv import load_dotenv
+
+from files import write_atomic
+from metrics import deck_insert_failures
+
+# Imported before main.py loads .env, and the backend settings are read at import
+_ = load_dotenv(Path(__file__).parent / ".env")
+
+
+# "supabase", or "local" to keep rows and files under DECK_STORAGE_DIR
+# instead (tests and offline development)
+DECK_STORAGE = os.environ.get("DECK_STORAGE", "supabase")
+DECK_STORAGE_DIR = Path(
+    os.environ.get(
+        "DECK_STORAGE_DIR", str(Path(__file__).parent / ".cache" / "storage")
+    )
+)
+DECK_TABLE = "decks2"
+DECK_BUCKET = "decks2"
+# Threads for blocking storage calls, apart from the threadpool that renders
+STORAGE_WORKERS = int(os.environ.get("STORAGE_WORKERS", "16"))
+# New deck rows are inserted in batches of up to this many rows...
+DECK_INSERT_BATCH_SIZE = int(os.environ.get("DECK_INSERT_BATCH_SIZE", "50"))
+# ...gathered for this many seconds; 0 inserts every row right away
+DECK_INSERT_DELAY = float(os.environ.get("DECK_INSERT_DELAY", "0"))
+# A failed batch stays buffered and is retried, backing off up to this long
+DECK_INSERT_BACKOFF_MAX = float(os.environ.get("DECK_INSERT_BACKOFF_MAX", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseStorage:
+    # The decks2 table and bucket through one supabase client, whose HTTP
+    # sessions are reused across calls. Every method blocks.
+    def __init__(self, url, key):
+        from supabase import create_client
+
+        self.client = create_client(url, key)
+
+    def _table(self):
+        return self.client.table(DECK_TABLE)
+
+    def _bucket(self):
+        return self.client.storage.from_(DECK_BUCKET)
+
+    def insert_decks(self, rows):
+        self._table().insert(rows).execute()
+
+    def update_deck(self, uuid, fields):
+        self._table().update(fields).eq("uuid", uuid).execute()
+
+    def delete_deck(self, uuid):
+        self._table().delete().eq("uuid", uuid).execute()
+
+    def get_deck(self, uuid, *columns):
+        data = self._table().select(", ".join(columns)).eq("uuid", uuid).execute()
+        return data.data[0] if data.data else None
+
+    def recent_deck(self, input_hash, since):
+        # Served by the decks2_input_hash_created_at_idx index
+        rows = (
+            self._table()
+            .select("uuid, json_content, pptx_filename")
+            .eq("input_hash", input_hash)
+            .gte("created_at", since)
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+            .data
+        )
+        return rows[0] if rows else None
+
+    def list_decks(self, limit, after=None):
+        # Keyset pagination on (created_at, uuid) descending, backed by the
+        # decks2_created_at_uuid_idx index: every page costs the same however deep
+        query = (
+            self._table()
+            .select("uuid, created_at")
+            .order("created_at", desc=True)
+            .order("uuid", desc=True)
+            .limit(limit)
+        )
+        if after:
+            created_at, uuid = after
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",uuid.lt."{uuid}")'
+            )
+        return query.execute().data
+
+    def count_decks(self, since=None):
+        query = self._table().select("uuid", count="exact", head=True)
+        if since:
+            query = query.gte("created_at", since)
+        return query.execute().count
+
+    def latest_created_at(self):
+        rows = (
+            self._table()
+            .select("created_at")
+            .order("created_at", desc=True)
+            .limit(1)
+            .execute()
+            .data
+        )
+        return rows[0]["created_at"] if rows else None
+
+    def upload(self, name, content, upsert=False):
+        self._bucket().upload(name, content, {"upsert": "true"} if upsert else None)
+
+    def download(self, name):
+        return self._bucket().download(name)
+
+    def remove(self, names):
+        self._bucket().remove(names)
+
+    def signed_url(self, name, ttl):
+        return self._bucket().create_signed_url(name, ttl, {"download": name})[
+            "signedURL"
+        ]
+
+
+class LocalStorage:
+    # SupabaseStorage's interface on the local filesystem: one JSON file per
+    # row and one file per object. Scans every row per query, so it is only
+    # meant for tests and development.
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.rows = self.directory / "tables" / DECK_TABLE
+        self.objects = self.directory / "objects" / DECK_BUCKET
+        self._lock = threading.Lock()
+
+    def _path(self, directory, name):
+        path = directory / name
+        if path.parent != directory:
+            raise ValueError(f"Invalid name: {name}")
+        return path
+
+    def _row_path(self, uuid):
+        return self._path(self.rows, f"{uuid}.json")
+
+    def _write_row(self, row):
+        write_atomic(self._row_path(row["uuid"]), json.dumps(row))
+
+    def _all_rows(self):
+        return [json.loads(path.read_text()) for path in self.rows.glob("*.json")]
+
+    def insert_decks(self, rows):
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            for row in rows:
+                self._write_row({"created_at": now, "version": 1, **row})
+
+    def update_deck(self, uuid, fields):
+        with self._lock:
+            row = self.get_deck(uuid)
+            if row is not None:
+                self._write_row({**row, **fields})
+
+    def delete_deck(self, uuid):
+        self._row_path(uuid).unlink(missing_ok=True)
+
+    def get_deck(self, uuid, *columns):
+        try:
+            row = json.loads(self._row_path(uuid).read_text())
+        except (OSError, ValueError):
+            return None
+        return {column: row.get(column) for column in columns} if columns else row
+
+    def recent_deck(self, input_hash, since):
+        rows = [
+            row
+            for row in self._all_rows()
+            if row.get("input_hash") == input_hash and row["created_at"] >= since
+        ]
+        if not rows:
+            return None
+        row = max(rows, key=lambda row: row["created_at"])
+        return {key: row.get(key) for key in ("uuid", "json_content", "pptx_filename")}
+
+    def list_decks(self, limit, after=None):
+        keys = sorted(
+            ((row["created_at"], row["uuid"]) for row in self._all_rows()),
+            reverse=True,
+        )
+        if after:
+            keys = [key for key in keys if key < tuple(after)]
+        return [{"uuid": uuid, "created_at": created} for created, uuid in keys[:limit]]
+
+    def count_decks(self, since=None):
+        return sum(
+            1 for row in self._all_rows() if since is None or row["created_at"] >= since
+        )
+
+    def latest_created_at(self):
+        return max((row["created_at"] for row in self._all_rows()), default=None)
+
+    def upload(self, name, content, upsert=False):
+        path = self._path(self.objects, name)
+        if path.exists() and not upsert:
+            raise FileExistsError(f"{DECK_BUCKET}/{name} already exists")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+
+    def download(self, name):
+        return self._path(self.objects, name).read_bytes()
+
+    def remove(self, names):
+        for name in names:
+            self._path(self.objects, name).unlink(missing_ok=True)
+
+    def signed_url(self, name, ttl):
+        return self._path(self.objects, name).resolve().as_uri()
+
+
+class DeckStore:
+    # Async access to a storage backend. Blocking calls run on a dedicated
+    # thread pool, so slow storage never holds up the threads that render.
+    # New deck rows are written behind: buffered, inserted in batches, and
+    # visible to the reads and writes here until they reach the table. Without
+    # a backend, create_backend() runs on the first call that needs one, so
+    # importing this module never loads the supabase client.
+    def __init__(
+        self,
+        backend=None,
+        workers=STORAGE_WORKERS,
+        batch_size=DECK_INSERT_BATCH_SIZE,
+        delay=DECK_INSERT_DELAY,
+    ):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.delay = delay
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="storage")
+        self.pending = {}  # uuid -> row waiting to be inserted
+        self.inserting = {}  # uuid -> row in the batch being inserted
+        self.stats = {"rows": 0, "batches": 0, "failures": 0}
+        self._flusher = None
+        self._lock = None
+
+    @property
+    def backend(self):
+        with self._backend_lock:
+            if self._backend is None:
+                self._backend = create_backend()
+            return self._backend
+
+    def _call(self, method, *args):
+        return getattr(self.backend, method)(*args)
+
+    async def _run(self, method, *args):
+        # The backend method runs on the storage pool, where a first call also
+        # creates the backend
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self._call, method, *args)
+        )
+
+    async def insert_deck(self, row):
+        if self.delay <= 0:
+            await self._run("insert_decks", [row])
+            return
+        self.pending[row["uuid"]] = row
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_later())
+        if len(self.pending) >= self.batch_size:
+            asyncio.ensure_future(self.flush())
+
+    async def _flush_later(self):
+        # Runs until the buffer is empty: rows are never dropped, however long
+        # the table is unavailable
+        failures = 0
+        while self.pending:
+            backoff = self.delay * 2 ** min(failures, 16)
+            await asyncio.sleep(min(backoff, DECK_INSERT_BACKOFF_MAX))
+            try:
+                await self.flush()
+                failures = 0
+            except Exception:
+                failures += 1
+                logger.exception(
+                    "Failed to insert %d buffered deck rows (attempt %d), retrying",
+                    len(self.pending),
+                    failures,
+                )
+
+    async def flush(self):
+        # Inserts every buffered row, batch_size at a time. A failed batch goes
+        # back to the front of the buffer and the error propagates.
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while self.pending:
+                self.inserting = dict(islice(self.pending.items(), self.batch_size))
+                for uuid in self.inserting:
+                    del self.pending[uuid]
+                try:
+                    await self._insert(list(self.inserting.values()))
+                except Exception:
+                    self.stats["failures"] += 1
+                    deck_insert_failures.inc()
+                    self.pending = {**self.inserting, **self.pending}
+                    raise
+                finally:
+                    self.inserting = {}
+
+    async def _insert(self, rows):
+        # One request per column set: PostgREST fills columns missing from a
+        # bulk insert with NULL, not their default (e.g. version)
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            await self._run("insert_decks", group)
+            for row in group:
+                del self.inserting[row["uuid"]]
+            self.stats["rows"] += len(group)
+            self.stats["batches"] += 1
+
+    async def _settle(self, uuid):
+        # Waits out the insert a row is part of, so it is either in the table
+        # or back in the buffer
+        if uuid in self.inserting:
+            async with self._lock:
+                pass
+
+    async def get_deck(self, uuid, *columns):
+        row = self.pending.get(uuid) or self.inserting.get(uuid)
+        if row is not None:
+            return {column: row.get(column) for column in columns}
+        return await self._run("get_deck", uuid, *columns)
+
+    async def update_deck(self, uuid, fields):
+        await self._settle(uuid)
+        if uuid in self.pending:
+            self.pending[uuid].update(fields)
+        else:
+            await self._run("update_deck", uuid, fields)
+
+    async def delete_deck(self, uuid):
+        await self._settle(uuid)
+        if self.pending.pop(uuid, None) is None:
+            await self._run("delete_deck", uuid)
+
+    async def recent_deck(self, input_hash, since):
+        # Buffered rows are newer than anything in the table
+        for row in reversed([*self.inserting.values(), *self.pending.values()]):
+            if row.get("input_hash") == input_hash:
+                return {
+                    key: row.get(key)
+                    for key in ("uuid", "json_content", "pptx_filename")
+                }
+        return await self._run("recent_deck", input_hash, since)
+
+    async def list_decks(self, limit, after=None):
+        return await self._run("list_decks", limit, after)
+
+    async def count_decks(self, since=None):
+        return await self._run("count_decks", since)
+
+    async def latest_created_at(self):
+        return await self._run("latest_created_at")
+
+    async def upload(self, name, content, upsert=False):
+        await self._run("upload", name, content, upsert)
+
+    async def download(self, name):
+        return await self._run("download", name)
+
+    async def remove(self, names):
+        await self._run("remove", names)
+
+    async def signed_url(self, name, ttl):
+        return await self._run("signed_url", name, ttl)
+
+    async def close(self):
+        # On shutdown: nothing buffered may be lost
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(
+                "Failed to insert %d deck rows on shutdown", len(self.pending)
+            )
+
+
+def create_backend():
+    if DECK_STORAGE == "local":
+        return LocalStorage(DECK_STORAGE_DIR)
+    return SupabaseStorage(
+        os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    )
+
+
+deck_store = DeckStore()
@@ -0,0 +1,7 @@
+import sys
+
+from pathlib import Path
+
+
+# The app is a set of top-level modules, imported from the repository root
+sys.path.insert(0, str(Path(__file__).parent.parent))
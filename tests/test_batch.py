@@ -0,0 +1,47 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from batch import parse_leads, run_batch, write_manifest
+
+
+def test_every_row_lands_in_the_archive():
+    # Decks big enough, and finishing together, for their zip writes to overlap
+    pptx_content = b"x" * 4_000_000
+
+    async def create_deck(row):
+        await asyncio.sleep(0.01)
+        if row["company"] == "fail":
+            raise RuntimeError("generation failed")
+        return f"uuid-{row['company']}", {}, pptx_content
+
+    rows = [{"company": str(i)} for i in range(32)] + [{"company": "fail"}]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        results, summary = asyncio.run(
+            run_batch(rows, create_deck, archive, concurrency=12)
+        )
+        write_manifest(archive, results, summary)
+
+    assert summary["done"] == 32 and summary["failed"] == 1
+    assert results[-1]["status"] == "failed"
+    with zipfile.ZipFile(buffer) as archive:
+        names = set(archive.namelist())
+        for result in results[:-1]:
+            assert result["status"] == "done"
+            assert archive.read(result["file"]) == pptx_content
+    assert names == {result["file"] for result in results[:-1]} | {"manifest.json"}
+
+
+def test_parse_leads_reads_csv_and_jsonl():
+    csv_rows = parse_leads("leads.csv", b"company,website\nAcme,acme.com\n,\n")
+    assert csv_rows == [{"company": "Acme", "website": "acme.com"}]
+    jsonl_rows = parse_leads("leads.jsonl", '{"company": "Acme"}\n\n{"company": "B"}')
+    assert jsonl_rows == [{"company": "Acme"}, {"company": "B"}]
+
+
+def test_parse_leads_rejects_broken_csv():
+    with pytest.raises(ValueError, match="Invalid CSV"):
+        parse_leads("leads.csv", 'company\n"' + "x" * 200_000)
@@ -0,0 +1,18 @@
+from benchmarks.coldstart import (
+    COLDSTART_BUDGET_MS,
+    LAZY_MODULES,
+    coldstart_env,
+    import_once,
+)
+
+
+def test_import_main_loads_no_lazy_modules():
+    _, modules, _ = import_once(coldstart_env())
+    assert [name for name in LAZY_MODULES if name in modules] == []
+
+
+def test_import_main_is_within_the_cold_start_budget():
+    # Fastest of three fresh interpreters, so one slow run on a busy machine
+    # doesn't fail the budget
+    fastest = min(import_once(coldstart_env())[0] for _ in range(3))
+    assert fastest <= COLDSTART_BUDGET_MS
@@ -0,0 +1,91 @@
+import asyncio
+
+import httpx
+import pytest
+
+import ai
+import fakes
+
+from cache import LRUCache, TieredCache
+from prompts import Prompt
+
+
+PREFIX = Prompt("master", "You are a presentation designer. " * 40, 0)
+
+
+@pytest.fixture(autouse=True)
+def gemini(monkeypatch):
+    # ai talks to fakes.gemini_app in process, with context caching on and the
+    # response cache off so every call reaches the fake
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setattr(ai, "GEMINI_API_BASE", "http://gemini.test/v1beta")
+    monkeypatch.setattr(ai, "GEMINI_CONTEXT_CACHE", True)
+    monkeypatch.setattr(ai, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(ai, "context_cache", TieredCache(LRUCache(64)))
+    monkeypatch.setattr(ai, "_uncacheable_prefixes", set())
+    monkeypatch.setitem(fakes.fake_latency, "gemini", 0)
+    monkeypatch.setitem(fakes.gemini_state, "cached_contents", {})
+    monkeypatch.setitem(fakes.gemini_state, "min_cached_tokens", 0)
+    for key in ("requests", "prompt_tokens", "cached_tokens"):
+        monkeypatch.setitem(fakes.gemini_state, key, 0)
+    return fakes.gemini_state
+
+
+def run(coro):
+    async def main():
+        ai._async_client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=fakes.gemini_app)
+        )
+        try:
+            return await coro
+        finally:
+            await ai.close_async_client()
+
+    return asyncio.run(main())
+
+
+async def stream(prompt, prefix):
+    return "".join([chunk async for chunk in ai.gemini_stream(prompt, prefix)])
+
+
+def test_prefix_is_cached_once_and_reused(gemini):
+    async def calls():
+        first = await ai.gemini_async("Topic: fire safety", PREFIX)
+        second = await ai.gemini_async("Topic: water safety", PREFIX)
+        return first, second
+
+    first, second = run(calls())
+    assert first and second
+    assert len(gemini["cached_contents"]) == 1
+    name = ai.context_cache.get(ai._context_key(PREFIX))
+    assert name in gemini["cached_contents"]
+    assert gemini["cached_tokens"] == 2 * fakes.estimate_tokens(PREFIX.text)
+
+
+@pytest.mark.parametrize("call", [ai.gemini_async, stream])
+def test_stale_context_is_retried_inline(gemini, call):
+    key = ai._context_key(PREFIX)
+    run(ai.get_cached_content(PREFIX))
+    stale = ai.context_cache.get(key)
+    gemini["cached_contents"].clear()  # expired or deleted on the server
+
+    assert run(call("Topic: fire safety", PREFIX))
+    # The inline retry carried the prefix, and the dead name was forgotten
+    assert gemini["cached_tokens"] == 0
+    assert gemini["prompt_tokens"] >= fakes.estimate_tokens(PREFIX.text)
+    assert ai.context_cache.get(key) != stale
+    assert key not in ai._uncacheable_prefixes
+
+
+def test_refused_prefix_falls_back_to_inline(gemini):
+    gemini["min_cached_tokens"] = 10**6
+
+    async def calls():
+        await ai.gemini_async("Topic: fire safety", PREFIX)
+        await ai.gemini_async("Topic: water safety", PREFIX)
+
+    run(calls())
+    assert gemini["cached_contents"] == {}
+    assert gemini["cached_tokens"] == 0
+    assert gemini["requests"] == 2
+    assert ai._context_key(PREFIX) in ai._uncacheable_prefixes
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from deck_models import (
+    DECK_RESPONSE_SCHEMA,
+    DeckError,
+    parse_deck,
+    parse_slide,
+    repair_slide,
+)
+
+
+HERO = {"type": "HERO", "title": "Safer shifts", "subtitle": "Gear", "imageURL": ""}
+CTA = {"type": "CTA", "headline": "Book a demo", "description": "This week"}
+
+
+def deck(*slides, **header):
+    return json.dumps({"logoURL": "", "color": "#0070C0", **header, "list": slides})
+
+
+def test_valid_deck_takes_the_fast_path():
+    content, repaired = parse_deck(deck(HERO, CTA))
+    assert not repaired
+    assert content["list"][1] == {**CTA, "link": "", "homepageLink": ""}
+
+
+def test_fenced_json_with_trailing_commas_is_repaired():
+    text = "Here you go:\n```json\n" + deck(HERO, CTA)[:-2] + ",]}\n```"
+    content, repaired = parse_deck(text)
+    assert repaired
+    assert [slide["type"] for slide in content["list"]] == ["HERO", "CTA"]
+
+
+def test_slide_repairs():
+    # Type near miss, missing text, a number and a lone object in a list field
+    slide = {
+        "type": "feature",
+        "title": 2024,
+        "features": {"title": "Fast", "description": "Very"},
+    }
+    assert repair_slide(slide) == {
+        "type": "FEATURES",
+        "title": "2024",
+        "features": [{"title": "Fast", "emoji": "", "description": "Very"}],
+    }
+    assert repair_slide({"type": "CTA"})["headline"] == ""
+    assert repair_slide({"type": "MYSTERY"}) is None
+    assert repair_slide("not a slide") is None
+
+
+def test_unusable_slides_are_dropped_and_an_empty_deck_is_an_error():
+    content, _ = parse_deck(deck(HERO, {"type": "MYSTERY"}))
+    assert [slide["type"] for slide in content["list"]] == ["HERO"]
+    with pytest.raises(DeckError):
+        parse_deck(deck({"type": "MYSTERY"}))
+    with pytest.raises(DeckError):
+        parse_deck("I can't help with that.")
+
+
+def test_parse_slide_validates_streamed_items():
+    assert parse_slide(HERO) == HERO
+    assert parse_slide({"type": "TESTIMONIAL", "testimonials": []})["type"] == (
+        "TESTIMONIALS"
+    )
+
+
+def test_response_schema_keeps_the_header_ahead_of_the_list():
+    assert DECK_RESPONSE_SCHEMA["propertyOrdering"] == ["logoURL", "color", "list"]
+    slide_schema = DECK_RESPONSE_SCHEMA["properties"]["list"]["items"]
+    assert "HERO" in slide_schema["properties"]["type"]["enum"]
+    assert slide_schema["required"] == ["type"]
+
+
+def test_validate_deck_regenerates_once_then_fails(monkeypatch):
+    import main
+
+    responses = [deck(HERO)]
+
+    async def gemini_async(prompt, prefix=None, response_schema=None, refresh=False):
+        assert refresh
+        return responses.pop(0)
+
+    monkeypatch.setattr(main, "gemini_async", gemini_async)
+    content = asyncio.run(main.validate_deck("not json", "prompt"))
+    assert content["list"][0]["title"] == "Safer shifts"
+
+    responses.append("still not json")
+    with pytest.raises(DeckError):
+        asyncio.run(main.validate_deck("not json", "prompt"))
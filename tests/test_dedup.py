@@ -0,0 +1,65 @@
+import asyncio
+
+from dedup import find_recent_deck, input_fingerprint, normalize_input
+from storage import DeckStore, LocalStorage
+
+
+def test_text_input_is_normalized():
+    assert normalize_input("  Acme \r\nfire gear  \r\n") == "Acme\nfire gear"
+    # NFC: a precomposed é and e + combining accent are the same input
+    assert normalize_input("Caf\u00e9") == normalize_input("Cafe\u0301")
+
+
+def test_json_input_ignores_key_order():
+    assert normalize_input({"b": 1, "a": "é"}) == normalize_input({"a": "é", "b": 1})
+
+
+def test_fingerprint_depends_on_the_context():
+    text = "Acme fire gear"
+    assert input_fingerprint(text, "v2") == input_fingerprint(text + "\n", "v2")
+    assert input_fingerprint(text, "v2") != input_fingerprint(text, "v3")
+
+
+def test_recent_deck_is_found_inside_the_window_only(tmp_path):
+    store = DeckStore(LocalStorage(tmp_path), workers=1, delay=0)
+    key = input_fingerprint("Acme fire gear", "v2")
+
+    async def main():
+        await store.insert_deck(
+            {
+                "uuid": "old",
+                "input_hash": key,
+                "json_content": {},
+                "pptx_filename": "old.pptx",
+            }
+        )
+        await asyncio.sleep(0.01)
+        await store.insert_deck(
+            {
+                "uuid": "new",
+                "input_hash": key,
+                "json_content": {},
+                "pptx_filename": "new.pptx",
+            }
+        )
+        return (
+            await find_recent_deck(store, key, window=3600),
+            await find_recent_deck(store, key, window=0.001),
+            await find_recent_deck(store, "other", window=3600),
+        )
+
+    newest, expired, unknown = asyncio.run(main())
+    assert newest["uuid"] == "new" and newest["pptx_filename"] == "new.pptx"
+    assert expired is None and unknown is None
+
+
+def test_buffered_rows_are_found_before_they_are_inserted(tmp_path):
+    store = DeckStore(LocalStorage(tmp_path), workers=1, delay=60)
+
+    async def main():
+        await store.insert_deck({"uuid": "a", "input_hash": "h", "json_content": {}})
+        found = await find_recent_deck(store, "h", window=3600)
+        await store.close()
+        return found
+
+    assert asyncio.run(main())["uuid"] == "a"
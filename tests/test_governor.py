@@ -0,0 +1,140 @@
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import governor
+
+from governor import AdaptiveLimiter, Governor, TokenBucket, retry_after_seconds
+
+
+def response(status, **headers):
+    return httpx.Response(
+        status, headers=headers, request=httpx.Request("GET", "https://api.test")
+    )
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Records the waits instead of sleeping
+    sleeps = []
+
+    async def async_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(governor.time, "sleep", sleeps.append)
+    monkeypatch.setattr(governor.asyncio, "sleep", async_sleep)
+    return sleeps
+
+
+def new_governor(max_retries=3):
+    return Governor(
+        "test",
+        rate=1000,
+        burst=1000,
+        concurrency=4,
+        max_concurrency=8,
+        max_retries=max_retries,
+        backoff_base=0.5,
+        backoff_max=30,
+    )
+
+
+def replies(*responses):
+    responses = list(responses)
+    return lambda: responses.pop(0)
+
+
+def test_token_bucket_spends_the_burst_then_paces():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+
+
+def test_limiter_grows_additively_and_halves_when_throttled():
+    limiter = AdaptiveLimiter(4, minimum=1, maximum=5)
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == pytest.approx(4.25)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == pytest.approx(2.125)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(throttled=True)
+    assert limiter.limit == 1 and limiter.in_flight == 0
+
+
+def test_limiter_blocks_coroutines_at_the_limit():
+    limiter = AdaptiveLimiter(1)
+
+    async def main():
+        limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds(response(429, **{"Retry-After": "7"})) == 7
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    date = when.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    assert 25 < retry_after_seconds(response(503, **{"Retry-After": date})) <= 30
+    assert retry_after_seconds(response(429, **{"Retry-After": "soon"})) is None
+    assert retry_after_seconds(response(429)) is None
+    assert retry_after_seconds(None) is None
+
+
+def test_call_retries_server_errors_with_backoff(sleeps):
+    gov = new_governor()
+    result = gov.call(replies(response(500), response(502), response(200)))
+    assert result.status_code == 200
+    assert gov.stats == {"calls": 1, "retries": 2, "throttled": 0, "failures": 0}
+    # Full jitter: each wait is at most base * 2**attempt
+    backoffs = [s for s in sleeps if s > 0]
+    assert len(backoffs) <= 2 and all(s <= 1.0 for s in backoffs)
+
+
+def test_call_honours_retry_after_and_backs_off_concurrency(sleeps):
+    gov = new_governor()
+    limit = gov.limiter.limit
+    result = gov.call(replies(response(429, **{"Retry-After": "3"}), response(200)))
+    assert result.status_code == 200
+    assert 3 in sleeps
+    assert gov.stats["throttled"] == 1
+    assert gov.limiter.limit < limit
+
+
+def test_call_raises_client_errors_without_retrying(sleeps):
+    gov = new_governor()
+    with pytest.raises(httpx.HTTPStatusError):
+        gov.call(replies(response(400), response(200)))
+    assert gov.stats["retries"] == 0
+
+
+def test_call_gives_up_after_max_retries(sleeps):
+    gov = new_governor(max_retries=2)
+    with pytest.raises(httpx.HTTPStatusError):
+        gov.call(replies(*[response(503)] * 3))
+    assert gov.stats["retries"] == 2 and gov.stats["failures"] == 1
+
+
+def test_acall_retries_transport_errors(sleeps):
+    gov = new_governor()
+    attempts = []
+
+    async def attempt():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("connection refused")
+        return response(200)
+
+    assert asyncio.run(gov.acall(attempt)).status_code == 200
+    assert len(attempts) == 2 and gov.limiter.in_flight == 0
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from jsonstream import DeckStreamParser
+
+
+DECK = {
+    "logoURL": "https://example.com/logo.png",
+    "color": "#0070C0",
+    "list": [
+        {"type": "HERO", "title": "Safer shifts", "subtitle": "Gear", "imageURL": ""},
+        {"type": "CTA", "title": "Book a demo", "subtitle": "This week"},
+    ],
+}
+
+
+def feed_in_chunks(parser, text, size):
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start : start + size]))
+    return items
+
+
+def test_items_are_emitted_as_they_complete():
+    text = "```json\n" + json.dumps(DECK, ensure_ascii=False) + "\n```"
+    for size in (1, 7, len(text)):
+        parser = DeckStreamParser()
+        assert feed_in_chunks(parser, text, size) == DECK["list"]
+        assert parser.header == {"logoURL": DECK["logoURL"], "color": DECK["color"]}
+        assert parser.emitted == 2
+
+
+def test_braces_inside_strings_are_not_structure():
+    deck = {"list": [{"type": "CTA", "title": 'Use {curly} and "[brackets]"'}]}
+    parser = DeckStreamParser()
+    assert feed_in_chunks(parser, json.dumps(deck), 3) == deck["list"]
+
+
+def test_malformed_item_is_skipped():
+    text = (
+        '{"color": "#000", "list": ['
+        '{"type": "HERO", "title": "Hi",},'
+        '{"type": "CTA", "title": "Bye"}]}'
+    )
+    parser = DeckStreamParser()
+    assert feed_in_chunks(parser, text, 5) == [{"type": "CTA", "title": "Bye"}]
+    assert parser.buffer == text
+
+
+def test_streamed_deck_with_malformed_item_is_repaired(monkeypatch):
+    import main
+
+    # A trailing comma in the HERO item: not streamed, fixed by the repair pass
+    text = json.dumps(DECK).replace('"imageURL": ""}', '"imageURL": "",}')
+
+    async def gemini_stream(prompt, prefix=None, response_schema=None):
+        for start in range(0, len(text), 16):
+            yield text[start : start + 16]
+
+    async def gemini_async(*args, **kwargs):
+        raise AssertionError("the deck was repairable, not regenerated")
+
+    monkeypatch.setattr(main, "gemini_stream", gemini_stream)
+    monkeypatch.setattr(main, "gemini_async", gemini_async)
+
+    async def stream():
+        run = {"input": "Acme safety gear", "parsed": asyncio.Queue()}
+        deck_content = await main.stream_master_prompt(run)
+        parsed = []
+        while not run["parsed"].empty():
+            parsed.append(run["parsed"].get_nowait())
+        return deck_content, parsed
+
+    deck_content, parsed = asyncio.run(stream())
+    assert [item["type"] for item in deck_content["list"]] == ["HERO", "CTA"]
+    assert [item["type"] for _, _, item in parsed[:-1]] == ["CTA"]
+    # The streamed slides don't match the repaired deck, so they are re-rendered
+    assert parsed[-1] is False
@@ -0,0 +1,56 @@
+import types
+
+import pytest
+
+from prometheus_client import REGISTRY
+
+from metrics import observe_pipeline, render_metrics, track_generation
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_track_generation_counts_outcomes_and_in_flight():
+    done = sample("deck_generations_total", status="done")
+    failed = sample("deck_generations_total", status="failed")
+    timed = sample("deck_generation_seconds_count")
+
+    with track_generation():
+        assert sample("deck_generations_in_flight") == 1
+    with pytest.raises(RuntimeError):
+        with track_generation():
+            raise RuntimeError("boom")
+
+    assert sample("deck_generations_total", status="done") == done + 1
+    assert sample("deck_generations_total", status="failed") == failed + 1
+    assert sample("deck_generation_seconds_count") == timed + 1
+    assert sample("deck_generations_in_flight") == 0
+
+
+def test_observe_pipeline_records_stages_critical_path_and_failure():
+    run = types.SimpleNamespace(
+        durations=lambda: {"master_prompt": 1.5, "image_search": 0.2, "render": 0.4},
+        critical_path=lambda: ["master_prompt", "render"],
+        error=RuntimeError("upload failed"),
+        failed="upload",
+    )
+    stage = sample("deck_stage_seconds_count", stage="image_search")
+    critical = sample("deck_critical_path_seconds_sum", stage="master_prompt")
+    off_path = sample("deck_critical_path_seconds_count", stage="image_search")
+    failures = sample("deck_generation_failures_total", stage="upload")
+
+    observe_pipeline(run)
+
+    assert sample("deck_stage_seconds_count", stage="image_search") == stage + 1
+    assert sample(
+        "deck_critical_path_seconds_sum", stage="master_prompt"
+    ) == pytest.approx(critical + 1.5)
+    assert sample("deck_critical_path_seconds_count", stage="image_search") == off_path
+    assert sample("deck_generation_failures_total", stage="upload") == failures + 1
+
+
+def test_render_metrics_exposes_the_text_format():
+    content, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE deck_stage_seconds histogram" in content
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from pipeline import Pipeline
+
+
+def diamond(events, fail=None):
+    # a -> (b, c) -> d, where b and c can overlap
+    pipeline = Pipeline("test")
+
+    def stage(name, after=(), seconds=0.0):
+        async def fn(run):
+            events.append(("start", name))
+            await asyncio.sleep(seconds)
+            if name == fail:
+                raise RuntimeError(f"{name} failed")
+            events.append(("end", name))
+            # Dependencies' results are readable by name
+            return "".join(run[dep] for dep in after) + name
+
+        async def undo(run):
+            events.append(("undo", name))
+
+        pipeline.stage(name, after=after, undo=undo)(fn)
+
+    stage("a")
+    stage("b", after=("a",), seconds=0.05)
+    stage("c", after=("a",), seconds=0.2)
+    stage("d", after=("b", "c"))
+    return pipeline
+
+
+def test_stages_run_after_their_dependencies_and_overlap():
+    events = []
+    pipeline = diamond(events)
+    run = asyncio.run(pipeline.run(id="deck-1"))
+
+    assert run["d"] == "abacd"
+    order = [event for event in events if event[0] == "start"]
+    assert order[0] == ("start", "a") and order[-1] == ("start", "d")
+    # b and c both started before either finished
+    assert events.index(("start", "c")) < events.index(("end", "b"))
+    assert run.critical_path() == ["a", "c", "d"]
+    assert pipeline.recent[-1]["id"] == "deck-1"
+    assert pipeline.recent[-1]["critical_path"] == ["a", "c", "d"]
+
+
+def test_a_failed_stage_cancels_the_others_and_undoes_started_stages():
+    events = []
+    pipeline = diamond(events, fail="b")
+    finished = []
+    pipeline.hooks.append(finished.append)
+
+    with pytest.raises(RuntimeError, match="b failed"):
+        asyncio.run(pipeline.run())
+
+    # c was cancelled mid-sleep, d never started
+    assert ("end", "c") not in events and ("start", "d") not in events
+    undone = [name for kind, name in events if kind == "undo"]
+    assert undone == ["c", "b", "a"]
+    run = finished[0]
+    assert run.failed == "b" and isinstance(run.error, RuntimeError)
+    assert pipeline.recent[-1]["failed"] == "b"
+
+
+def test_stages_may_only_run_after_registered_stages():
+    pipeline = Pipeline("test")
+    with pytest.raises(ValueError, match="unknown stages"):
+        pipeline.stage("render", after=("master_prompt",))
@@ -0,0 +1,115 @@
+import copy
+import io
+import zipfile
+
+import pytest
+
+from PIL import Image
+
+from pptx_patch import PatchError, item_slide_parts, patch_item
+from renderer import get_renderer
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+LOGO_URL = "https://example.com/logo.png"
+HERO_URL = "https://example.com/hero.png"
+NEW_HERO_URL = "https://example.com/hero-2.png"
+ASSETS = {LOGO_URL: png("blue"), HERO_URL: png("red"), NEW_HERO_URL: png("green")}
+TESTIMONIAL = {"testimonial": "Great", "firstName": "Ada", "lastName": "L"}
+DECK = {
+    "logoURL": LOGO_URL,
+    "color": "#0070C0",
+    "list": [
+        {
+            "type": "HERO",
+            "title": "Safer shifts",
+            "subtitle": "Gear",
+            "imageURL": HERO_URL,
+        },
+        {"type": "CTA", "headline": "Book a demo", "description": "This week"},
+        {"type": "TESTIMONIALS", "testimonials": [TESTIMONIAL] * 3},
+    ],
+}
+
+
+def render(deck, renderer="v2"):
+    output = io.BytesIO()
+    get_renderer(renderer).create(deck, assets=ASSETS, output=output)
+    return output.getvalue()
+
+
+def render_item(deck, index, renderer="v2"):
+    output = io.BytesIO()
+    get_renderer(renderer).create_item(deck, index, assets=ASSETS, output=output)
+    return output.getvalue()
+
+
+def texts(pptx_content):
+    from pptx import Presentation
+
+    prs = Presentation(io.BytesIO(pptx_content))
+    return [
+        [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        for slide in prs.slides
+    ]
+
+
+def media(pptx_content):
+    package = zipfile.ZipFile(io.BytesIO(pptx_content))
+    return {
+        name: package.read(name)
+        for name in package.namelist()
+        if name.startswith("ppt/media/")
+    }
+
+
+def edit(index, **changes):
+    deck = copy.deepcopy(DECK)
+    deck["list"][index].update(changes)
+    return deck
+
+
+def test_patching_one_item_matches_a_full_render():
+    deck_content = render(DECK)
+    edited = edit(1, headline="Start your pilot")
+    patched = patch_item(deck_content, 1, render_item(edited, 1))
+    assert texts(patched) == texts(render(edited))
+
+    # Slides of the other items are copied untouched
+    old = zipfile.ZipFile(io.BytesIO(deck_content))
+    new = zipfile.ZipFile(io.BytesIO(patched))
+    for index in (0, 2):
+        old_parts = item_slide_parts(old, index)
+        assert old_parts == item_slide_parts(new, index)
+        assert all(old.read(part) == new.read(part) for part in old_parts)
+
+
+def test_shared_media_is_reused_and_replaced_media_dropped():
+    deck_content = render(DECK)
+    edited = edit(0, imageURL=NEW_HERO_URL)
+    patched = patch_item(deck_content, 0, render_item(edited, 0))
+    images = set(media(patched).values())
+    assert ASSETS[NEW_HERO_URL] in images and ASSETS[HERO_URL] not in images
+    # The logo is stored once, not once per package it came from
+    assert sum(content == ASSETS[LOGO_URL] for content in media(patched).values()) == 1
+    assert texts(patched) == texts(render(edited))
+
+
+def test_an_item_that_renders_more_slides_is_not_patched():
+    edited = edit(2, testimonials=[TESTIMONIAL] * 5)
+    with pytest.raises(PatchError, match="renders 3 slides instead of 2"):
+        patch_item(render(DECK, "v2"), 2, render_item(edited, 2, "v2"))
+
+
+def test_a_deck_without_tagged_slides_is_not_patched():
+    from pptx import Presentation
+
+    untagged = io.BytesIO()
+    Presentation().save(untagged)
+    with pytest.raises(PatchError, match="No slides tagged"):
+        patch_item(untagged.getvalue(), 0, render_item(DECK, 0))
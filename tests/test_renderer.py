@@ -0,0 +1,70 @@
+import io
+
+from PIL import Image
+
+from assets import collect_image_urls
+from renderer import get_renderer
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+LOGO_URL = "https://example.com/logo.png"
+
+
+def render(name, items, assets=None):
+    from pptx import Presentation
+
+    data = {"logoURL": LOGO_URL, "color": "#0070C0", "list": items}
+    output = io.BytesIO()
+    get_renderer(name).create(data, assets=assets or {}, output=output)
+    return Presentation(io.BytesIO(output.getvalue()))
+
+
+def pictures(slide):
+    return [shape for shape in slide.shapes if shape.shape_type == 13]
+
+
+def test_v2_renders_unknown_types_as_themed_blank_slides():
+    prs = render("v2", [{"type": "MYSTERY"}], {LOGO_URL: png()})
+    assert len(prs.slides) == 1
+    assert len(pictures(prs.slides[0])) == 1
+
+
+def test_v1_skips_unknown_types():
+    assert len(render("v1", [{"type": "MYSTERY"}]).slides) == 0
+
+
+def test_v3_logo_is_only_on_the_last_testimonial_slide():
+    testimonial = {"testimonial": "Great", "firstName": "Ada", "lastName": "L"}
+    item = {"type": "TESTIMONIALS", "testimonials": [testimonial] * 3}
+    prs = render("v3", [item], {LOGO_URL: png()})
+    assert [len(pictures(slide)) for slide in prs.slides] == [0, 0, 1]
+
+
+def test_v3_content_title_is_left_alone_without_a_title():
+    item = {"type": "FEATURES", "features": [{"title": "Fast", "description": "d"}]}
+    slide = render("v3", [item]).slides[0]
+    assert slide.shapes.title.text == ""
+    assert slide.shapes.title.text_frame.paragraphs[0].runs == ()
+
+
+def test_streaming_deck_fetches_each_items_images_as_it_arrives(monkeypatch):
+    import renderer
+
+    fetched = []
+
+    def prefetch_assets(data, known=None):
+        urls = [url for url in collect_image_urls(data) if url not in known]
+        fetched.append(urls)
+        return {**(known or {}), **{url: png() for url in urls}}
+
+    monkeypatch.setattr(renderer, "prefetch_assets", prefetch_assets)
+    deck = renderer.StreamingDeck({"color": "#0070C0"}, "v2")
+    deck.add(0, {"type": "HERO", "title": "Hi", "imageURL": "https://x/hero.jpg"})
+    deck.add(1, {"type": "CTA", "headline": "Go", "imageURL": "https://x/cta.jpg"})
+    assert fetched == [[], ["https://x/cta.jpg"]]
+    assert "https://x/cta.jpg" in deck.assets
@@ -0,0 +1,41 @@
+import asyncio
+
+import storage
+
+from storage import DeckStore
+
+
+class FlakyBackend:
+    # Fails the first `failures` inserts, like a table that is briefly down
+    def __init__(self, failures):
+        self.failures = failures
+        self.rows = []
+
+    def insert_decks(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("table unavailable")
+        self.rows.extend(rows)
+
+
+def test_buffered_rows_survive_failed_inserts(monkeypatch):
+    monkeypatch.setattr(storage, "DECK_INSERT_BACKOFF_MAX", 0.02)
+    backend = FlakyBackend(failures=6)
+    store = DeckStore(backend, workers=1, delay=0.001)
+
+    async def insert():
+        for i in range(3):
+            await store.insert_deck({"uuid": str(i), "json_content": {}})
+        await store._flusher
+
+    asyncio.run(insert())
+    assert [row["uuid"] for row in backend.rows] == ["0", "1", "2"]
+    assert store.pending == {}
+    assert store.stats["failures"] == 6
+
+
+def test_rows_are_inserted_right_away_by_default():
+    backend = FlakyBackend(failures=0)
+    store = DeckStore(backend, workers=1)
+    asyncio.run(store.insert_deck({"uuid": "a", "json_content": {}}))
+    assert backend.rows == [{"uuid": "a", "json_content": {}}]